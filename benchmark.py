@@ -0,0 +1,244 @@
+import argparse
+import gc
+import glob
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+import tracemalloc
+from concept_graph import ConceptGraph
+from el_reasoner import Ontology, ELReasoner
+from el_reasoner_second import ELReasoner2
+from el_reasoner_third import ELReasoner3
+from schedulers import STRATEGIES
+
+"""
+Reproducible benchmarks of the reasoners on TestOntologies/ and on synthetic TBoxes.
+
+Every input is measured in separate phases:
+    parse       ontology file -> concept graph (not measured for synthetic inputs)
+    preprocess  concept graph -> EL normal form
+    saturate    subsumers of the sampled classes with reasoner 1, 2 or 3 (a new reasoner per class),
+                or "classify": all class names in one saturation with reasoner 3
+Each measurement is preceded by warm-up runs and repeated, the median and percentiles of the runs
+are reported, and the peak memory of one extra run is traced with tracemalloc. Classes are sampled
+and synthetic TBoxes generated with a fixed seed, so runs on different versions measure the same work.
+
+Commands:
+    python benchmark.py run --reasoners 3 classify --output current.json
+    python benchmark.py compare baseline.json current.json
+"""
+
+PHASES = ["parse", "preprocess", "saturate"]
+
+
+class PreparedOntology:
+    # an already parsed and preprocessed ontology with the interface of Ontology used by the reasoners
+    def __init__(self, graph, normalized_graph):
+        self.concept_graph = graph
+        self.normalized_graph = normalized_graph
+
+    def get_concept_graph(self):
+        return self.concept_graph
+
+    def get_normalized_graph(self):
+        return self.normalized_graph
+
+
+def synthetic_graph(n_names, seed, n_roles=3):
+    """
+    Random TBox over n_names concept names: a told taxonomy, existential restrictions and
+    conjunctive definitions, roughly 2 GCIs per name.
+    """
+    rnd = random.Random(seed)
+    graph = ConceptGraph()
+    names = [graph.concept_name(f"A{i}") for i in range(n_names)]
+    roles = [graph.role(f"r{i}") for i in range(n_roles)]
+    for i in range(1, n_names):
+        graph.add_gci(names[i], names[rnd.randrange(i)])
+        if rnd.random() < 0.5:
+            graph.add_gci(names[i], graph.existential(rnd.choice(roles), rnd.choice(names)))
+        if rnd.random() < 0.3:
+            definition = graph.conjunction(rnd.choice(names[:i]),
+                                           graph.existential(rnd.choice(roles), rnd.choice(names)))
+            graph.add_gci(names[i], definition)
+            graph.add_gci(definition, names[i])
+    graph.input_concepts = graph.sub_concepts(concept for gci in graph.gcis for concept in gci)
+    graph.input_concepts.update(names)
+    graph.input_concepts.add(graph.top)
+    return graph
+
+
+def measure(function, repeat, warmup):
+    # wall-clock seconds of every repetition, after the warm-up runs
+    for _ in range(warmup):
+        function()
+    samples = []
+    for _ in range(repeat):
+        gc.collect()
+        start_time = time.perf_counter()
+        function()
+        samples.append(time.perf_counter() - start_time)
+    return samples
+
+
+def peak_memory(function):
+    gc.collect()
+    tracemalloc.start()
+    try:
+        function()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def summary(samples):
+    if len(samples) > 1:
+        deciles = statistics.quantiles(samples, n=10, method="inclusive")
+        p10, p90 = deciles[0], deciles[-1]
+    else:
+        p10 = p90 = samples[0]
+    return {"median": statistics.median(samples), "p10": p10, "p90": p90,
+            "min": min(samples), "max": max(samples), "samples": samples}
+
+
+def query_function(reasoner, ontology, class_names, strategy="lifo"):
+    if reasoner == "classify":
+        return lambda: ELReasoner3(ontology=ontology).classify()
+
+    def run():
+        for class_name in class_names:
+            if reasoner == "1":
+                ELReasoner(ontology=ontology, class_name=class_name).start()
+            elif reasoner == "2":
+                ELReasoner2(ontology=ontology, class_name=class_name, strategy=strategy).start_2()
+            else:
+                ELReasoner3(ontology=ontology, class_name=class_name).start_3()
+    return run
+
+
+def get_inputs(args):
+    # (name, function returning a new concept graph, True if loading it is the parse phase)
+    inputs = []
+    for ontology_file in sorted(glob.glob(args.ontologies)):
+        if os.path.isfile(ontology_file):
+            inputs.append((ontology_file,
+                           lambda f=ontology_file: Ontology(ontology_file=f, loader=args.loader).get_concept_graph(),
+                           True))
+    for size in args.synthetic:
+        inputs.append((f"synthetic-{size}", lambda n=size: synthetic_graph(n, args.seed), False))
+    return inputs
+
+
+def benchmark(args):
+    results = []
+    for input_name, load, parsed in get_inputs(args):
+        graph = load()
+        normalized_graph = graph.normalize()
+        ontology = PreparedOntology(graph, normalized_graph)
+        class_names = sorted(graph.args[concept] for concept in graph.concept_names())
+        class_names = random.Random(args.seed).sample(class_names, min(args.classes, len(class_names)))
+        info = {"input": input_name, "n_names": len(graph.concept_names()), "n_gcis": len(graph.gcis),
+                "n_classes": len(class_names)}
+        print(f"{input_name}: {info['n_names']} names, {info['n_gcis']} GCIs", file=sys.stderr)
+
+        functions = []
+        if parsed:
+            functions.append(("-", "parse", load))
+        functions.append(("-", "preprocess", graph.normalize))
+        for reasoner in args.reasoners:
+            functions.append((reasoner, "saturate", query_function(reasoner, ontology, class_names, args.strategy)))
+        for reasoner, phase, function in functions:
+            result = dict(info, reasoner=reasoner, phase=phase)
+            result.update(summary(measure(function, args.repeat, args.warmup)))
+            result["peak_memory"] = peak_memory(function) if args.memory else None
+            results.append(result)
+            print(f"    {phase:<10} {reasoner:<8} median {result['median']:.4f}s"
+                  f" p10 {result['p10']:.4f}s p90 {result['p90']:.4f}s", file=sys.stderr)
+    return results
+
+
+def run(args):
+    results = benchmark(args)
+    report = {"meta": {"python": platform.python_version(), "platform": platform.platform(),
+                       "date": time.strftime("%Y-%m-%d %H:%M:%S"), "seed": args.seed,
+                       "repeat": args.repeat, "warmup": args.warmup, "loader": args.loader,
+                       "strategy": args.strategy},
+              "results": results}
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=1)
+    print(f"results written to {args.output}", file=sys.stderr)
+
+
+def compare(args):
+    """
+    Compare the medians (and peak memory) of two runs.
+    :return: exit status, 1 if a measurement got slower than the threshold allows
+    """
+    def load(path):
+        with open(path) as file:
+            return {(r["input"], r["reasoner"], r["phase"]): r for r in json.load(file)["results"]}
+
+    baseline, current = load(args.baseline), load(args.current)
+    regressions = 0
+    for key in sorted(baseline.keys() & current.keys()):
+        before, after = baseline[key], current[key]
+        change = after["median"] / before["median"] - 1 if before["median"] > 0 else 0.0
+        # small absolute differences are noise, whatever their ratio
+        slower = change > args.threshold and after["median"] - before["median"] > args.min_delta
+        memory_change = None
+        if before.get("peak_memory") and after.get("peak_memory"):
+            memory_change = after["peak_memory"] / before["peak_memory"] - 1
+            slower = slower or memory_change > args.threshold
+        regressions += slower
+        memory = f" memory {memory_change:+.1%}" if memory_change is not None else ""
+        print(f"{'REGRESSION' if slower else 'ok':<10} {key[0]} {key[1]} {key[2]}: "
+              f"{before['median']:.4f}s -> {after['median']:.4f}s ({change:+.1%}){memory}")
+    for key in sorted(baseline.keys() ^ current.keys()):
+        print(f"{'missing':<10} {key[0]} {key[1]} {key[2]}: only in {'baseline' if key in baseline else 'current'}")
+    print(f"{regressions} regression(s)")
+    return 1 if regressions else 0
+
+
+def main():
+    command_line_parser = argparse.ArgumentParser(description='Benchmark the reasoners.')
+    commands = command_line_parser.add_subparsers(dest='command', required=True)
+    run_parser = commands.add_parser('run', help='Run the benchmarks')
+    run_parser.add_argument('--ontologies', type=str, default='TestOntologies/*',
+                            help='Glob pattern of the ontology files')
+    run_parser.add_argument('--synthetic', type=int, nargs='*', default=[500, 2000],
+                            help='Numbers of concept names of the synthetic TBoxes')
+    run_parser.add_argument('--reasoners', nargs='+', choices=['1', '2', '3', 'classify'],
+                            default=['3', 'classify'], help='Reasoners measured in the saturate phase')
+    run_parser.add_argument('--classes', type=int, default=5, help='Number of sampled classes per input')
+    run_parser.add_argument('--repeat', type=int, default=5, help='Number of measured runs')
+    run_parser.add_argument('--warmup', type=int, default=1, help='Number of warm-up runs')
+    run_parser.add_argument('--seed', type=int, default=0, help='Seed of the class sampling and synthetic inputs')
+    run_parser.add_argument('--no-memory', dest='memory', action='store_false',
+                            help='Skip the tracemalloc run for peak memory')
+    run_parser.add_argument('--loader', choices=['gateway', 'python'], default='python',
+                            help='Parse the ontologies with dl4python or in python without a JVM (default)')
+    run_parser.add_argument('--strategy', choices=sorted(STRATEGIES), default='lifo',
+                            help='Queue strategy of reasoner 2')
+    run_parser.add_argument('--output', type=str, default='benchmark.json', help='Output JSON file')
+    compare_parser = commands.add_parser('compare', help='Compare a run against a baseline')
+    compare_parser.add_argument('baseline', type=str, help='JSON file of the baseline run')
+    compare_parser.add_argument('current', type=str, help='JSON file of the current run')
+    compare_parser.add_argument('--threshold', type=float, default=0.1,
+                                help='Relative slowdown that counts as a regression')
+    compare_parser.add_argument('--min-delta', type=float, default=0.001,
+                                help='Absolute slowdown in seconds below which nothing is flagged')
+    args = command_line_parser.parse_args()
+
+    if args.command == 'run':
+        run(args)
+    else:
+        sys.exit(compare(args))
+
+
+if __name__ == "__main__":
+    # command example: python benchmark.py run --reasoners 1 2 3 --classes 3 --output baseline.json
+    main()
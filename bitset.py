@@ -0,0 +1,82 @@
+"""
+Concept labels of elements as bitsets over the integer concept ids of a ConceptGraph.
+
+Bit i of the python int is set when concept i is in the label, so union, intersection, difference
+and subset tests work on whole machine words at once, and a copy of a label only copies a reference
+to the (immutable) int. The class behaves like a set of concept ids for the code that iterates labels.
+"""
+
+
+class ConceptSet:
+    __slots__ = ("bits",)
+
+    def __init__(self, concepts=(), bits=0):
+        for concept in concepts:
+            bits |= 1 << concept
+        self.bits = bits
+
+    def add(self, concept):
+        self.bits |= 1 << concept
+
+    def discard(self, concept):
+        self.bits &= ~(1 << concept)
+
+    def update(self, other):
+        self.bits |= other.bits if isinstance(other, ConceptSet) else ConceptSet(other).bits
+
+    def copy(self):
+        # copies are made for every label in every rule step, so __init__ is skipped
+        copied = ConceptSet.__new__(ConceptSet)
+        copied.bits = self.bits
+        return copied
+
+    def __contains__(self, concept):
+        return self.bits >> concept & 1 == 1
+
+    def __iter__(self):
+        # the binary string starts with the highest bit, reversed its i-th digit is bit i
+        digits = bin(self.bits)[:1:-1]
+        i = digits.find("1")
+        while i != -1:
+            yield i
+            i = digits.find("1", i + 1)
+
+    def __len__(self):
+        return self.bits.bit_count()
+
+    def __bool__(self):
+        return self.bits != 0
+
+    def __eq__(self, other):
+        if isinstance(other, ConceptSet):
+            return self.bits == other.bits
+        if isinstance(other, (set, frozenset)):
+            return self.bits == ConceptSet(other).bits
+        return NotImplemented
+
+    __hash__ = None
+
+    def __or__(self, other):
+        return ConceptSet(bits=self.bits | other.bits)
+
+    def __and__(self, other):
+        return ConceptSet(bits=self.bits & other.bits)
+
+    def __sub__(self, other):
+        return ConceptSet(bits=self.bits & ~other.bits)
+
+    def union(self, other):
+        return self | other
+
+    def difference(self, other):
+        # the concepts that are new in self compared to other
+        return self - other
+
+    def issubset(self, other):
+        return self.bits & ~other.bits == 0
+
+    def __le__(self, other):
+        return self.issubset(other)
+
+    def __repr__(self):
+        return f"ConceptSet({sorted(self)})"
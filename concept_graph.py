@@ -0,0 +1,414 @@
+"""
+Interned, integer-ID representation of EL concepts, roles and GCIs.
+
+The TBox and the sub-concepts of an ontology are pulled across the java gateway once
+(see Ontology.get_concept_graph) and the reasoners saturate on this graph without
+calling back into the JVM.
+"""
+
+# concept kinds, indexed by the simple class names used by dl4python
+NAME = 0
+TOP = 1
+CONJUNCTION = 2
+EXISTENTIAL = 3
+BOTTOM = 4
+
+CONCEPT_TYPES = {"ConceptName": NAME,
+                 "TopConcept$": TOP,
+                 "BottomConcept$": BOTTOM,
+                 "ConceptConjunction": CONJUNCTION,
+                 "ExistentialRoleRestriction": EXISTENTIAL}
+
+
+class ConceptGraph:
+    def __init__(self):
+        # concept id -> kind
+        self.kinds = []
+        # concept id -> name (NAME), None (TOP, BOTTOM), (conjunct, conjunct) or (role, filler)
+        self.args = []
+        # (kind, args) -> concept id, used to intern every concept exactly once
+        self.concept_ids = {}
+        # role id -> role name
+        self.roles = []
+        self.role_ids = {}
+        # GCIs as (lhs, rhs) pairs of concept ids
+        self.gcis = []
+        # lhs -> rhs concepts of the GCIs, so the ⊑-rule only fires the axioms a concept triggers
+        self.told_subsumers = {}
+        # conjunct -> (partner, conjunction) for every conjunction, used by ⊓-rule 2
+        self.conjunctions_with = {}
+        # names introduced by normalize() and nominals {a} of the python loader,
+        # they are not reported as subsumers
+        self.fresh_concepts = set()
+        # concepts occurring in the ontology, only those are assigned by the reasoners
+        self.input_concepts = set()
+        # index of the lhs symbols of the GCIs for locality_module, rebuilt after the TBox changed
+        self.module_index = None
+        # ⊑-rule tables of told_hierarchy.told_sets, rebuilt after the TBox changed
+        self.told_cache = {}
+        # graph a module was extracted from (see module_graph), None otherwise
+        self.source = None
+        self.top = self.intern(TOP, None)
+        self.bottom = self.intern(BOTTOM, None)
+
+    def __len__(self):
+        return len(self.kinds)
+
+    def intern(self, kind, args):
+        key = (kind, args)
+        concept = self.concept_ids.get(key)
+        if concept is None:
+            concept = len(self.kinds)
+            self.kinds.append(kind)
+            self.args.append(args)
+            self.concept_ids[key] = concept
+        return concept
+
+    def role(self, name):
+        role = self.role_ids.get(name)
+        if role is None:
+            role = len(self.roles)
+            self.roles.append(name)
+            self.role_ids[name] = role
+        return role
+
+    def concept_name(self, name):
+        return self.intern(NAME, name)
+
+    def conjunction(self, first, second):
+        # C ⊓ D and D ⊓ C are the same concept
+        if first > second:
+            first, second = second, first
+        size = len(self.kinds)
+        conjunction = self.intern(CONJUNCTION, (first, second))
+        if conjunction == size:
+            self.conjunctions_with.setdefault(first, []).append((second, conjunction))
+            if first != second:
+                self.conjunctions_with.setdefault(second, []).append((first, conjunction))
+        return conjunction
+
+    def existential(self, role, filler):
+        return self.intern(EXISTENTIAL, (role, filler))
+
+    def find_concept_name(self, name):
+        # None for a name that does not occur in the graph, unlike concept_name it adds nothing
+        return self.concept_ids.get((NAME, name))
+
+    def find_conjunction(self, first, second):
+        if first > second:
+            first, second = second, first
+        return self.concept_ids.get((CONJUNCTION, (first, second)))
+
+    def find_existential(self, role, filler):
+        return self.concept_ids.get((EXISTENTIAL, (role, filler)))
+
+    def add_gci(self, lhs, rhs):
+        self.gcis.append((lhs, rhs))
+        self.told_subsumers.setdefault(lhs, []).append(rhs)
+        self.module_index = None
+        self.told_cache = {}
+
+    def remove_gci(self, lhs, rhs):
+        # a GCI added twice has to be removed twice
+        if rhs not in self.told_subsumers.get(lhs, ()):
+            raise ValueError(f"{self.format_gci((lhs, rhs))} is not in the TBox")
+        self.gcis.remove((lhs, rhs))
+        told = self.told_subsumers[lhs]
+        told.remove(rhs)
+        if not told:
+            del self.told_subsumers[lhs]
+        self.module_index = None
+        self.told_cache = {}
+
+    def fresh_name(self):
+        concept = self.concept_name(f"_:X{len(self.fresh_concepts)}")
+        self.fresh_concepts.add(concept)
+        return concept
+
+    def concept_names(self):
+        return [concept for concept, kind in enumerate(self.kinds)
+                if kind == NAME and concept not in self.fresh_concepts]
+
+    def all_class_names(self):
+        # names of all classes of the ontology, also for a module, an unsatisfiable class is subsumed by each of them
+        graph = self.source if self.source is not None else self
+        return {graph.args[concept] for concept in graph.concept_names()}
+
+    def sub_concepts(self, concepts):
+        # all concepts occurring in the given concepts, including themselves
+        found = set()
+        stack = list(concepts)
+        while stack:
+            concept = stack.pop()
+            if concept in found:
+                continue
+            found.add(concept)
+            kind = self.kinds[concept]
+            if kind == CONJUNCTION:
+                stack.extend(self.args[concept])
+            elif kind == EXISTENTIAL:
+                stack.append(self.args[concept][1])
+        return found
+
+    def signature(self, concept):
+        # concept names (as concept ids) and roles (as ~role id, so they never clash) occurring in the concept
+        symbols = set()
+        for sub_concept in self.sub_concepts([concept]):
+            kind = self.kinds[sub_concept]
+            if kind == NAME:
+                symbols.add(sub_concept)
+            elif kind == EXISTENTIAL:
+                symbols.add(~self.args[sub_concept][0])
+        return symbols
+
+    def get_module_index(self):
+        """
+        :return: number of lhs symbols of every GCI, symbol -> indexes of the GCIs with it in their lhs,
+                 indexes of the GCIs with ⊤ as lhs
+        """
+        if self.module_index is None:
+            counts = []
+            waiting = {}
+            unconditional = []
+            for i, (lhs, rhs) in enumerate(self.gcis):
+                symbols = self.signature(lhs)
+                counts.append(len(symbols))
+                for symbol in symbols:
+                    waiting.setdefault(symbol, []).append(i)
+                if not symbols:
+                    unconditional.append(i)
+            self.module_index = counts, waiting, unconditional
+        return self.module_index
+
+    def locality_module(self, concepts, signature=None):
+        """
+        Syntactic ⊥-locality module of the TBox for the signature of the given concepts.
+        A GCI is not ⊥-local as soon as all symbols of its lhs are in the signature (EL has no
+        disjunction, and ⊥ in a lhs at most adds a GCI that is not needed), it then joins the module
+        and its symbols join the signature. Every subsumer of the concepts that follows from the TBox
+        already follows from the module, and so does their unsatisfiability.
+        :param signature: set that receives the symbols of the module (see signature()), if given
+        :return: list of the GCIs of the module, in TBox order
+        """
+        counts, waiting, unconditional = self.get_module_index()
+        # GCI index -> number of lhs symbols not in the signature yet
+        missing = list(counts)
+        if signature is None:
+            signature = set()
+        stack = []
+        module = list(unconditional)
+
+        def extend(symbols):
+            for symbol in symbols:
+                if symbol not in signature:
+                    signature.add(symbol)
+                    stack.append(symbol)
+
+        for i in unconditional:
+            extend(self.signature(self.gcis[i][1]))
+        for concept in concepts:
+            extend(self.signature(concept))
+        while stack:
+            for i in waiting.get(stack.pop(), ()):
+                missing[i] -= 1
+                if missing[i] == 0:
+                    module.append(i)
+                    extend(self.signature(self.gcis[i][1]))
+        return [self.gcis[i] for i in sorted(module)]
+
+    def module_graph(self, class_names):
+        """
+        :param class_names: names of the query classes
+        :return: a new concept graph with only the locality module of the TBox for the classes
+        """
+        graph = ConceptGraph()
+        graph.source = self
+        copies = {self.top: graph.top, self.bottom: graph.bottom}
+
+        def copy(concept):
+            copied = copies.get(concept)
+            if copied is None:
+                kind = self.kinds[concept]
+                if kind == NAME:
+                    copied = graph.concept_name(self.args[concept])
+                    if concept in self.fresh_concepts:
+                        graph.fresh_concepts.add(copied)
+                elif kind == CONJUNCTION:
+                    copied = graph.conjunction(copy(self.args[concept][0]), copy(self.args[concept][1]))
+                else:
+                    role, filler = self.args[concept]
+                    copied = graph.existential(graph.role(self.roles[role]), copy(filler))
+                copies[concept] = copied
+            return copied
+
+        concepts = [self.concept_ids[(NAME, name)] for name in class_names if (NAME, name) in self.concept_ids]
+        for lhs, rhs in self.locality_module(concepts):
+            graph.add_gci(copy(lhs), copy(rhs))
+        graph.input_concepts = graph.sub_concepts(concept for gci in graph.gcis for concept in gci)
+        graph.input_concepts.update(graph.concept_name(name) for name in class_names)
+        graph.input_concepts.add(graph.top)
+        return graph
+
+    def normalize(self):
+        """
+        Rewrite the GCIs into EL normal form with fresh names:
+            A ⊑ B,  A1 ⊓ A2 ⊑ B,  A ⊑ ∃r.B,  ∃r.A ⊑ B
+        where A, A1, A2, B are concept names, ⊤ or ⊥.
+        :return: a new concept graph with the normalized GCIs, the concept names are kept
+        """
+        graph = ConceptGraph()
+        # complex concept -> fresh name, separately for left and right hand sides
+        lhs_names = {}
+        rhs_names = {}
+
+        def atom(concept):
+            if self.kinds[concept] == TOP:
+                return graph.top
+            if self.kinds[concept] == BOTTOM:
+                return graph.bottom
+            copied = graph.concept_name(self.args[concept])
+            if concept in self.fresh_concepts:
+                graph.fresh_concepts.add(copied)
+            return copied
+
+        def lhs_name(concept):
+            # a name A with concept ⊑ A
+            kind = self.kinds[concept]
+            if kind == NAME or kind == TOP or kind == BOTTOM:
+                return atom(concept)
+            name = lhs_names.get(concept)
+            if name is None:
+                name = graph.fresh_name()
+                lhs_names[concept] = name
+                if kind == CONJUNCTION:
+                    first, second = self.args[concept]
+                    graph.add_gci(graph.conjunction(lhs_name(first), lhs_name(second)), name)
+                else:
+                    role, filler = self.args[concept]
+                    graph.add_gci(graph.existential(graph.role(self.roles[role]), lhs_name(filler)), name)
+            return name
+
+        def rhs_name(concept):
+            # a name A with A ⊑ concept
+            kind = self.kinds[concept]
+            if kind == NAME or kind == TOP or kind == BOTTOM:
+                return atom(concept)
+            name = rhs_names.get(concept)
+            if name is None:
+                name = graph.fresh_name()
+                rhs_names[concept] = name
+                add_rhs(name, concept)
+            return name
+
+        def add_rhs(name, concept):
+            kind = self.kinds[concept]
+            if kind == CONJUNCTION:
+                for conjunct in self.args[concept]:
+                    add_rhs(name, conjunct)
+            elif kind == EXISTENTIAL:
+                role, filler = self.args[concept]
+                graph.add_gci(name, graph.existential(graph.role(self.roles[role]), rhs_name(filler)))
+            elif kind != TOP:
+                graph.add_gci(name, atom(concept))
+
+        for concept in self.concept_names():
+            atom(concept)
+        for lhs, rhs in self.gcis:
+            add_rhs(lhs_name(lhs), rhs)
+        graph.input_concepts = graph.sub_concepts(concept for gci in graph.gcis for concept in gci)
+        graph.input_concepts.update(graph.concept_names())
+        graph.input_concepts.add(graph.top)
+        return graph
+
+    def format(self, concept):
+        kind = self.kinds[concept]
+        if kind == NAME:
+            return self.args[concept]
+        if kind == TOP:
+            return "⊤"
+        if kind == BOTTOM:
+            return "⊥"
+        if kind == CONJUNCTION:
+            first, second = self.args[concept]
+            return f"({self.format(first)} ⊓ {self.format(second)})"
+        role, filler = self.args[concept]
+        return f"∃{self.roles[role]}.{self.format(filler)}"
+
+    def format_gci(self, gci):
+        return f"{self.format(gci[0])} ⊑ {self.format(gci[1])}"
+
+    @classmethod
+    def from_gateway(cls, axioms, sub_concepts=None, formatter=None, concept_names=None):
+        """
+        Translate dl4python axioms (and concepts) into a concept graph. The result is interned, but the
+        translation is not memoized: py4j returns a new proxy every time a java object is fetched, so a
+        sub-concept that occurs in several axioms is translated with its own round trips each time.
+        :param axioms: GeneralConceptInclusion / EquivalenceAxiom / DisjointnessAxiom proxies,
+                       other axioms are skipped
+        :param sub_concepts: concepts occurring in the ontology (ontology.getSubConcepts()),
+                             if None the sub-concepts of the axioms are used
+        :param formatter: SimpleDLFormatter used to name concept names, str() is used otherwise
+        :param concept_names: concept names of the ontology (ontology.getConceptNames()), so that
+                              names without axioms are classified as well
+        """
+        graph = cls()
+        for concept in concept_names or ():
+            graph.translate(concept, formatter)
+        for axiom in axioms:
+            for lhs, rhs in graph.axiom_gcis(axiom, formatter):
+                graph.add_gci(lhs, rhs)
+        if sub_concepts is None:
+            graph.input_concepts = graph.sub_concepts(concept for gci in graph.gcis for concept in gci)
+            graph.input_concepts.add(graph.top)
+        else:
+            for concept in sub_concepts:
+                concept = graph.translate(concept, formatter)
+                if concept is not None:
+                    graph.input_concepts.add(concept)
+        return graph
+
+    def axiom_gcis(self, axiom, formatter=None):
+        # the GCIs of a GeneralConceptInclusion / EquivalenceAxiom / DisjointnessAxiom proxy, none for other axioms
+        axiomType = axiom.getClass().getSimpleName()
+        if axiomType == "GeneralConceptInclusion":
+            lhs = self.translate(axiom.lhs(), formatter)
+            rhs = self.translate(axiom.rhs(), formatter)
+            if lhs is not None and rhs is not None:
+                return [(lhs, rhs)]
+        elif axiomType == "EquivalenceAxiom":
+            concepts = [self.translate(concept, formatter) for concept in axiom.getConcepts()]
+            if None not in concepts:
+                return [gci for conceptA, conceptB in zip(concepts, concepts[1:])
+                        for gci in [(conceptA, conceptB), (conceptB, conceptA)]]
+        elif axiomType == "DisjointnessAxiom":
+            # C and D are disjoint: C ⊓ D ⊑ ⊥ for every pair
+            concepts = [self.translate(concept, formatter) for concept in axiom.getConcepts()]
+            if None not in concepts:
+                return [(self.conjunction(conceptA, conceptB), self.bottom)
+                        for i, conceptA in enumerate(concepts) for conceptB in concepts[i + 1:]]
+        return []
+
+    def translate(self, concept, formatter=None):
+        # returns None for concepts outside of EL, a few round trips per sub-concept of the proxy
+        conceptType = CONCEPT_TYPES.get(concept.getClass().getSimpleName())
+        if conceptType == NAME:
+            return self.concept_name(formatter.format(concept) if formatter is not None else str(concept))
+        if conceptType == TOP:
+            return self.top
+        if conceptType == BOTTOM:
+            return self.bottom
+        if conceptType == CONJUNCTION:
+            conjuncts = [self.translate(conjunct, formatter) for conjunct in concept.getConjuncts()]
+            if len(conjuncts) == 0 or None in conjuncts:
+                return None
+            # conjunctions are binary after convertToBinaryConjunctions, nest them otherwise
+            result = conjuncts[0]
+            for conjunct in conjuncts[1:]:
+                result = self.conjunction(result, conjunct)
+            return result
+        if conceptType == EXISTENTIAL:
+            filler = self.translate(concept.filler(), formatter)
+            if filler is None:
+                return None
+            return self.existential(self.role(str(concept.role())), filler)
+        return None
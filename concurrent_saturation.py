@@ -0,0 +1,304 @@
+import argparse
+import multiprocessing
+import os
+import queue
+import traceback
+from collections import deque
+from el_reasoner import Ontology
+from concept_graph import NAME, CONJUNCTION, EXISTENTIAL
+from saturation import Element
+
+"""
+Concurrent saturation of one reasoning task (one class, several classes or a whole classification)
+in the style of ELK: the elements are partitioned over worker processes and saturated in parallel.
+
+The element with initial concept C is owned by worker C % workers. Every worker applies the rules
+to its own elements with a local worklist, like SaturationEngine, and only the two rules that
+connect elements send messages:
+    ∃-rule 1  d has ∃r.C: ("link", C, r, d) to the owner of C, which creates the element for C if
+              needed and records d as its r-predecessor
+    ∃-rule 2  e has C and an r-predecessor d: ("add", d, ∃r.C) to the owner of d
+              (and ("add", d, ⊥) if C is ⊥, an element with ⊥ only passes ⊥ on)
+Messages are collected per target worker and sent as one batch after the local worklist is empty.
+
+Termination is detected with a shared counter of outstanding batches: a worker adds the batches it
+sends and subtracts the batches it has finished processing in one locked update, before it sends
+them. The counter reaches 0 only when no batch is queued or being processed, then all workers stop
+and report the subsumers of their elements. The model is never copied or compared.
+
+A worker that fails sends its traceback instead of its subsumers, and the parent raises it. The
+parent polls the results with a timeout, so a worker that dies without reporting (killed, out of
+memory) raises an error instead of blocking forever.
+"""
+
+# seconds between the liveness checks of the workers while waiting for their results
+POLL_INTERVAL = 0.5
+
+
+class Partition:
+    def __init__(self, graph, worker, workers, roots):
+        """
+        :param worker: number of this worker
+        :param workers: number of workers
+        :param roots: concepts of the query classes, they get elements even if they are not input concepts
+        """
+        self.graph = graph
+        self.worker = worker
+        self.workers = workers
+        self.input_concepts = graph.input_concepts
+        self.roots = roots
+        # initial concept -> own element
+        self.elements = {}
+        self.active = deque()
+        # worker -> messages to send after the local worklist is empty
+        self.outbox = {}
+        self.total = 0
+
+    def owner(self, concept):
+        return concept % self.workers
+
+    def send(self, concept, message):
+        # message about the element with this initial concept
+        if self.owner(concept) == self.worker:
+            self.receive([message])
+        else:
+            self.outbox.setdefault(self.owner(concept), []).append(message)
+
+    def element_for(self, concept):
+        element = self.elements.get(concept)
+        if element is None:
+            element = Element(len(self.elements), concept)
+            self.elements[concept] = element
+            self.add(element, concept)
+            # ⊤-rule: Add ⊤ to any individual
+            # only concepts from the input are assigned
+            if self.graph.top in self.input_concepts:
+                self.add(element, self.graph.top)
+        return element
+
+    def add(self, element, concept):
+        if concept in element.concepts:
+            return
+        element.concepts.add(concept)
+        if not element.todo:
+            self.active.append(element)
+        element.todo.append(concept)
+
+    def existential(self, role, filler):
+        # only concepts from the input are assigned, ∃r.⊥ is unsatisfiable, so it is ⊥ itself
+        if filler == self.graph.bottom:
+            return filler
+        existential = self.graph.find_existential(role, filler)
+        if existential is not None and existential in self.input_concepts:
+            return existential
+        return None
+
+    def receive(self, messages):
+        for message in messages:
+            if message[0] == "add":
+                _, concept, existential = message
+                self.add(self.elements[concept], existential)
+            elif message[0] == "link":
+                _, filler, role, predecessor = message
+                element = self.element_for(filler)
+                predecessors = element.predecessors.setdefault(role, set())
+                if predecessor not in predecessors:
+                    predecessors.add(predecessor)
+                    # ∃-rule 2 for the new edge: every concept C of the element gives ∃r.C
+                    # (a copy, with an edge to itself the element gets the new concepts)
+                    for concept in list(element.concepts):
+                        existential = self.existential(role, concept)
+                        if existential is not None:
+                            self.send(predecessor, ("add", predecessor, existential))
+            else:
+                self.element_for(message[1])
+
+    def apply_completion_rules(self, element, concept):
+        graph = self.graph
+        kind = graph.kinds[concept]
+        # ⊓-rule 1: If d has C ⊓ D assigned, assign also C and D to d
+        if kind == CONJUNCTION:
+            for conjunct in graph.args[concept]:
+                if conjunct in self.input_concepts:
+                    self.add(element, conjunct)
+        # ⊓-rule 2: If d has C and D assigned, assign also C ⊓ D to d
+        for partner, conjunction in graph.conjunctions_with.get(concept, ()):
+            if partner in element.concepts and conjunction in self.input_concepts:
+                self.add(element, conjunction)
+        # ∃-rule 1: If d has ∃r.C assigned, the element with initial concept C becomes its r-successor
+        if kind == EXISTENTIAL:
+            role, filler = graph.args[concept]
+            if filler in self.input_concepts or filler in self.roots:
+                successors = element.successors.setdefault(role, set())
+                if filler not in successors:
+                    successors.add(filler)
+                    self.send(filler, ("link", filler, role, element.initial_concept))
+        # ∃-rule 2: If d has an r-successor with C assigned, add ∃r.C to d
+        for role, predecessors in element.predecessors.items():
+            existential = self.existential(role, concept)
+            if existential is not None:
+                for predecessor in predecessors:
+                    self.send(predecessor, ("add", predecessor, existential))
+        # ⊑-rule: If d has C assigned and C ⊑ D ∈ T, then also assign D to d
+        for rhs in graph.told_subsumers.get(concept, ()):
+            self.add(element, rhs)
+
+    def saturate(self):
+        while self.active:
+            element = self.active.popleft()
+            while element.todo:
+                concept = element.todo.popleft()
+                # the element has every subsumer, only ⊥ still has to reach its predecessors
+                if self.graph.bottom in element.concepts and concept != self.graph.bottom:
+                    continue
+                self.total += 1
+                self.apply_completion_rules(element, concept)
+
+    def take_outbox(self):
+        outbox, self.outbox = self.outbox, {}
+        return outbox
+
+    def subsumers(self):
+        # subsumer names of the own query classes
+        graph = self.graph
+        subsumers = {}
+        for root in self.roots:
+            element = self.elements.get(root)
+            if element is None:
+                continue
+            if graph.bottom in element.concepts:
+                subsumers[graph.args[root]] = graph.all_class_names()
+            else:
+                subsumers[graph.args[root]] = {graph.args[c] for c in element.concepts
+                                               if graph.kinds[c] == NAME and c not in graph.fresh_concepts}
+        return subsumers
+
+
+def run_worker(graph, worker, workers, roots, inboxes, results, outstanding, done):
+    try:
+        partition = saturate_partition(graph, worker, workers, roots, inboxes, outstanding, done)
+    except BaseException:
+        # the exception may not be picklable, the parent raises the traceback
+        results.put((worker, None, traceback.format_exc()))
+        # the other workers stop as well, the task has failed anyway
+        done.set()
+        return
+    results.put((worker, partition.subsumers(), partition.total))
+
+
+def saturate_partition(graph, worker, workers, roots, inboxes, outstanding, done):
+    partition = Partition(graph, worker, workers, roots)
+    inbox = inboxes[worker]
+    while True:
+        try:
+            batches = [inbox.get(timeout=0.01)]
+        except queue.Empty:
+            if done.is_set():
+                break
+            continue
+        # everything that arrived meanwhile is processed in the same round
+        while True:
+            try:
+                batches.append(inbox.get_nowait())
+            except queue.Empty:
+                break
+        for batch in batches:
+            partition.receive(batch)
+        partition.saturate()
+        outbox = partition.take_outbox()
+        # the outgoing batches are counted before they are sent, the processed ones are finished
+        with outstanding.get_lock():
+            outstanding.value += len(outbox) - len(batches)
+            if outstanding.value == 0:
+                done.set()
+        for target, messages in outbox.items():
+            inboxes[target].put(messages)
+    return partition
+
+
+def concurrent_subsumers(graph, class_names, workers=None):
+    """
+    Saturate the elements of the given classes (and every element they need) in worker processes.
+    :param graph: concept graph, in EL normal form for the best partitioning
+    :param workers: number of worker processes, os.cpu_count() if None
+    :return: dictionary class name -> set of subsumer names, number of processed facts
+    """
+    workers = workers or os.cpu_count()
+    # names that do not occur in the ontology are only subsumed by themselves, they are not added to the graph
+    subsumers = {class_name: {class_name} for class_name in class_names if graph.find_concept_name(class_name) is None}
+    roots = {graph.find_concept_name(class_name) for class_name in class_names if class_name not in subsumers}
+    context = multiprocessing.get_context()
+    inboxes = [context.Queue() for _ in range(workers)]
+    results = context.Queue()
+    outstanding = context.Value("q", 0)
+    done = context.Event()
+    initial = {}
+    for root in roots:
+        initial.setdefault(root % workers, []).append(("init", root))
+    outstanding.value = len(initial)
+    for worker, messages in initial.items():
+        inboxes[worker].put(messages)
+    if not initial:
+        done.set()
+    processes = [context.Process(target=run_worker,
+                                 args=(graph, worker, workers, roots, inboxes, results, outstanding, done))
+                 for worker in range(workers)]
+    for process in processes:
+        process.start()
+    total = 0
+    reported = set()
+    # workers found dead without a result at the previous poll
+    dead = set()
+    try:
+        while len(reported) < workers:
+            try:
+                worker, worker_subsumers, worker_total = results.get(timeout=POLL_INTERVAL)
+            except queue.Empty:
+                # a result put just before exiting arrives within one more poll, a worker that is
+                # still missing after that has died without reporting
+                for worker, process in enumerate(processes):
+                    if worker not in reported and not process.is_alive():
+                        if worker in dead or process.exitcode != 0:
+                            raise RuntimeError(f"worker {worker} exited with code {process.exitcode} "
+                                               f"without reporting its subsumers")
+                        dead.add(worker)
+                continue
+            if worker_subsumers is None:
+                raise RuntimeError(f"worker {worker} failed:\n{worker_total}")
+            reported.add(worker)
+            subsumers.update(worker_subsumers)
+            total += worker_total
+    finally:
+        # after a failure the remaining workers are stopped, they would wait for batches forever
+        for process in processes:
+            if process.is_alive() and len(reported) < workers:
+                process.terminate()
+            process.join()
+    return subsumers, total
+
+
+def main():
+    command_line_parser = argparse.ArgumentParser(description='Saturate one reasoning task with several processes.')
+    command_line_parser.add_argument('ontology_file', type=str, help='Path to the ontology file')
+    command_line_parser.add_argument('class_names', type=str, nargs='*',
+                                     help='Names of the classes, all class names of the ontology if omitted')
+    command_line_parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                                     help='Number of worker processes')
+    command_line_parser.add_argument('--cache-dir', type=str, default=None,
+                                     help='Directory of the compiled-ontology cache (disabled by default)')
+    command_line_parser.add_argument('--loader', choices=['gateway', 'python'], default='gateway',
+                                     help='Parse the ontology with dl4python (default) or in python without a JVM')
+    args = command_line_parser.parse_args()
+
+    ontology = Ontology(ontology_file=args.ontology_file, cache_dir=args.cache_dir, loader=args.loader)
+    graph = ontology.get_normalized_graph()
+    class_names = args.class_names or [graph.args[concept] for concept in graph.concept_names()]
+    subsumers, n_facts = concurrent_subsumers(graph, class_names, args.workers)
+    # 1 class name per line, followed by its subsumers
+    for class_name in class_names:
+        print(f"{class_name}: {', '.join(sorted(subsumers[class_name]))}")
+
+
+if __name__ == "__main__":
+    # command example: python concurrent_saturation.py TestOntologies/pizza.owl --workers 4 --loader python
+    main()
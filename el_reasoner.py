@@ -1,30 +1,78 @@
 from py4j.java_gateway import JavaGateway
-from itertools import combinations
 import argparse
+import os
+import sys
+from bitset import ConceptSet
+from element_store import ElementStore
+from instrumentation import Instrumentation
+from told_hierarchy import told_sets
+from concept_graph import ConceptGraph, NAME, CONJUNCTION, EXISTENTIAL
+from ontology_cache import load_graphs, save_graphs
+from owl_loader import load_ontology
 
 """
-Run the following command in a terminal before running the code:
+Run the following command in a terminal before running the code
+(not needed with --loader python):
 java -jar dl4python-0.1-jar-with-dependencies.jar
 """
 
 
-def copy_elements(elements):
-    copied_elements = {element: {prop: set(value) if isinstance(value, set) else value
-                                 for prop, value in elements[element].items()}
-                       for element in elements}
-    return copied_elements
+def add_initial_concept(elements, initial_elements, d, concept):
+    # initial_elements maps every initial concept to the element that has it,
+    # so checking whether a concept is already initial somewhere takes constant time
+    if concept not in initial_elements:
+        initial_elements[concept] = d
+        elements[d].initial_concepts.add(concept)
 
 
 class Ontology:
-    def __init__(self, ontology_file):
+    def __init__(self, ontology_file, cache_dir=None, loader="gateway"):
+        self.ontology_file = ontology_file
+        # directory of the compiled-ontology cache, None to disable it
+        self.cache_dir = cache_dir
+        # "gateway": parse with dl4python, "python": parse the EL fragment without a JVM
+        self.loader = loader
+        # constructs skipped by the python loader
+        self.skipped_constructs = {}
+        self.concept_graph = None
+        self.normalized_graph = None
+        # the gateway is only connected when the ontology is needed in the JVM,
+        # a cache hit does not need it at all
+        self._gateway = None
+        self._formatter = None
+        self._ontology = None
+        if cache_dir is not None:
+            cached = load_graphs(ontology_file, cache_dir, loader)
+            if cached is not None:
+                (self.concept_graph, self.normalized_graph), self.skipped_constructs = cached
+
+    def connect(self):
         # connect to the java gateway of dl4python
-        self.gateway = JavaGateway()
+        self._gateway = JavaGateway()
         # get a formatter to print in nice DL format
-        self.formatter = self.gateway.getSimpleDLFormatter()
+        self._formatter = self._gateway.getSimpleDLFormatter()
         # load an ontology from a file
-        self.ontology = self.gateway.getOWLParser().parseFile(ontology_file)
+        self._ontology = self._gateway.getOWLParser().parseFile(self.ontology_file)
         # convert to binary conjunctions
-        self.gateway.convertToBinaryConjunctions(self.ontology)
+        self._gateway.convertToBinaryConjunctions(self._ontology)
+
+    @property
+    def gateway(self):
+        if self._gateway is None:
+            self.connect()
+        return self._gateway
+
+    @property
+    def formatter(self):
+        if self._gateway is None:
+            self.connect()
+        return self._formatter
+
+    @property
+    def ontology(self):
+        if self._gateway is None:
+            self.connect()
+        return self._ontology
 
     def get_tbox_axioms(self, replace_equivalent=False):
         # get the TBox axioms
@@ -49,11 +97,44 @@ class Ontology:
             final_axioms = axioms
         return final_axioms
 
+    def get_concept_graph(self):
+        # pull the TBox and the sub-concepts across the gateway once,
+        # the reasoners only work on the resulting python concept graph
+        if self.concept_graph is None:
+            if self.loader == "python":
+                self.concept_graph, self.skipped_constructs = load_ontology(self.ontology_file)
+            else:
+                self.concept_graph = ConceptGraph.from_gateway(self.ontology.tbox().getAxioms(),
+                                                               self.ontology.getSubConcepts(),
+                                                               self.formatter,
+                                                               self.ontology.getConceptNames())
+            if self.cache_dir is not None:
+                save_graphs(self.ontology_file, self.cache_dir, [self.concept_graph, self.get_normalized_graph()],
+                            self.loader, self.skipped_constructs)
+        return self.concept_graph
+
+    def get_normalized_graph(self):
+        # the concept graph with the TBox in EL normal form
+        if self.normalized_graph is None:
+            self.normalized_graph = self.get_concept_graph().normalize()
+        return self.normalized_graph
+
 
 class ELReasoner:
-    def __init__(self, ontology, class_name):
+    def __init__(self, ontology, class_name, instrumentation=None, module=False, told_closure=False):
         self.ontology = ontology
         self.class_name = class_name
+        # Instrumentation recording rule statistics, None to disable it
+        self.instrumentation = instrumentation
+        # saturate only the locality module of the TBox for the class instead of the whole TBox
+        self.module = module
+        # let the ⊑-rule assign all told ancestors of a name at once (see told_hierarchy.py)
+        self.told_closure = told_closure
+        self.graph = None
+        # initial concept -> element, maintained while the completion rules are applied
+        self.initial_elements = {}
+        # rule -> bitset of the concepts it can fire on
+        self.rule_masks = {}
 
     def lecture_example_tbox(self):
         elFactory = self.ontology.gateway.getELFactory()
@@ -87,168 +168,185 @@ class ELReasoner:
         return {a1, a2, a3, a4, a5}
 
     def print_elements(self, elements):
-        for element in elements.keys():
-            print(element)
-            for prop in elements[element]:
-                if prop == "concepts" or prop == "initial_concepts":
-                    print(f"    {prop}: {[self.ontology.formatter.format(x) for x in elements[element][prop]]}")
-                else:
-                    print(f"    {prop}: {elements[element][prop]}")
-
-    def get_input(self, d, tbox):
-        elFactory = self.ontology.gateway.getELFactory()
-        elementary = ["ConceptName", "TopConcept$"]
+        for d, element in enumerate(elements):
+            print(f"d{d}")
+            print(f"    initial_concepts: {[self.graph.format(x) for x in element.initial_concepts]}")
+            print(f"    concepts: {[self.graph.format(x) for x in element.concepts]}")
+            for role, successors in element.successors.items():
+                print(f"    {self.graph.roles[role]}_successor: {sorted(f'd{e}' for e in successors)}")
+
+    def get_input(self, d, graph):
         input_concepts = set()
         input_concepts.update(list(d))
-        input_concepts.add(elFactory.getTop())
-        input_concepts.update(tbox)
-        while len(tbox) != 0:
-            new_tbox = set()
-            processed_concepts = set()
-            for concept in tbox:
-                conceptType = concept.getClass().getSimpleName()
-                if conceptType in elementary:
-                    input_concepts.add(concept)
-                else:
-                    if conceptType == "ExistentialRoleRestriction":
-                        first = concept.role()
-                        second = concept.filler()
-                    elif conceptType == "ConceptConjunction":
-                        first = concept.getConjuncts()[0]
-                        second = concept.getConjuncts()[1]
-                    elif conceptType == "GeneralConceptInclusion":
-                        first = concept.lhs()
-                        second = concept.rhs()
-                    else:
-                        continue
-                    input_concepts.add(first)
-                    input_concepts.add(second)
-                    new_tbox.add(first)
-                    new_tbox.add(second)
-                processed_concepts.add(concept)
-            # Add elements to tbox after the iteration is complete
-            tbox.update(new_tbox)
-            # Remove processed elements from tbox
-            tbox = new_tbox
-
+        input_concepts.add(graph.top)
+        input_concepts.update(graph.sub_concepts(concept for gci in graph.gcis for concept in gci))
         return input_concepts
 
+    def get_rule_masks(self, graph):
+        # a label is intersected with the mask of a rule before it is iterated,
+        # so the loops only visit concepts the rule can actually fire on
+        masks = {"conjunction": ConceptSet(), "conjunct": ConceptSet(), "existential": ConceptSet(),
+                 "filler": ConceptSet(), "told": ConceptSet(graph.told_subsumers)}
+        for concept, kind in enumerate(graph.kinds):
+            if kind == CONJUNCTION:
+                masks["conjunction"].add(concept)
+                masks["conjunct"].update(graph.args[concept])
+            elif kind == EXISTENTIAL:
+                masks["existential"].add(concept)
+                masks["filler"].add(graph.args[concept][1])
+        return masks
+
+    def get_graph(self, mode, normalized=False, module=False):
+        if mode == "lecture_example":
+            graph = ConceptGraph.from_gateway(self.lecture_example_tbox(), formatter=self.ontology.formatter)
+            return graph.normalize() if normalized else graph
+        graph = self.ontology.get_normalized_graph() if normalized else self.ontology.get_concept_graph()
+        if module:
+            return graph.module_graph([self.class_name])
+        return graph
+
+    def copy_elements(self, elements):
+        if self.instrumentation is not None:
+            self.instrumentation.copied(len(elements))
+        return elements.copy()
+
     def apply_completion_rules(self, d, elements, tbox, input_concepts):
 
-        elFactory = self.ontology.gateway.getELFactory()
+        graph = self.graph
+        masks = self.rule_masks
+        stats = self.instrumentation
 
         # ⊤-rule: Add ⊤ to any individual
         # only concepts from the input are assigned
-        top_concept = elFactory.getTop()
+        top_concept = graph.top
+        if stats is not None:
+            stats.start_rule(elements[d])
         if top_concept in input_concepts:
-            elements[d]["concepts"].add(top_concept)
-            if top_concept not in set().union(*(info["initial_concepts"] for element, info in elements.items())):
-                elements[d]["initial_concepts"].add(top_concept)
-        current_elements = copy_elements(elements)
+            elements[d].concepts.add(top_concept)
+            add_initial_concept(elements, self.initial_elements, d, top_concept)
+        if stats is not None:
+            stats.end_rule("⊤", elements[d], int(top_concept in input_concepts))
+        current_elements = self.copy_elements(elements)
         changed = False
         # ⊓-rule 1: If d has C ⊓ D assigned, assign also C and D to d
         # only concepts from the input are assigned
-        for concept in current_elements[d]["concepts"]:
-            conceptType = concept.getClass().getSimpleName()
-            if conceptType == "ConceptConjunction":
-                for conjunct in concept.getConjuncts():
+        if stats is not None:
+            stats.start_rule(elements[d])
+        for concept in current_elements[d].concepts & masks["conjunction"]:
+            if graph.kinds[concept] == CONJUNCTION:
+                for conjunct in graph.args[concept]:
                     if conjunct in input_concepts:
-                        elements[d]["concepts"].add(conjunct)
+                        elements[d].concepts.add(conjunct)
                         changed = True
-                        if (conjunct not in set().union(*(info["initial_concepts"]
-                                                          for element, info in elements.items()))):
-                            elements[d]["initial_concepts"].add(conjunct)
+                        add_initial_concept(elements, self.initial_elements, d, conjunct)
+        if stats is not None:
+            stats.end_rule("⊓1", elements[d], len(current_elements[d].concepts & masks["conjunction"]))
         if changed:
-            current_elements = copy_elements(elements)
+            current_elements = self.copy_elements(elements)
         changed = False
         # ⊓-rule 2: If d has C and D assigned, assign also C ⊓ D to d
         # only concepts from the input are assigned
-        for pair in combinations(current_elements[d]["concepts"], 2):
-            conjunction_opt1 = elFactory.getConjunction(pair[0], pair[1])
-            conjunction_opt2 = elFactory.getConjunction(pair[1], pair[0])
-            if conjunction_opt1 in input_concepts:
-                elements[d]["concepts"].add(conjunction_opt1)
-                changed = True
-                if (conjunction_opt1 not in set().union(*(info["initial_concepts"]
-                                                          for element, info in elements.items()))):
-                    elements[d]["initial_concepts"].add(conjunction_opt1)
-            elif conjunction_opt2 in input_concepts:
-                elements[d]["concepts"].add(conjunction_opt2)
-                changed = True
-                if (conjunction_opt2 not in set().union(*(info["initial_concepts"]
-                                                          for element, info in elements.items()))):
-                    elements[d]["initial_concepts"].add(conjunction_opt2)
+        # only conjunctions occurring in the ontology are checked, through the conjunct index
+        if stats is not None:
+            stats.start_rule(elements[d])
+        for concept in current_elements[d].concepts & masks["conjunct"]:
+            for partner, conjunction in graph.conjunctions_with.get(concept, ()):
+                if partner in current_elements[d].concepts and conjunction in input_concepts:
+                    elements[d].concepts.add(conjunction)
+                    changed = True
+                    add_initial_concept(elements, self.initial_elements, d, conjunction)
+        if stats is not None:
+            stats.end_rule("⊓2", elements[d], len(current_elements[d].concepts & masks["conjunct"]))
         if changed:
-            current_elements = copy_elements(elements)
+            current_elements = self.copy_elements(elements)
         changed = False
         # ∃-rule 1: If d has ∃r.C assigned
         # only concepts from the input are assigned
-        for concept in current_elements[d]["concepts"]:
-            conceptType = concept.getClass().getSimpleName()
-            if conceptType == "ExistentialRoleRestriction":
-                role = concept.role()
-                filler = concept.filler()
-                if f"{role}_successor" not in current_elements[d]:
-                    elements[d][f"{role}_successor"] = set()
-                    changed = True
-                successor_found = False
+        if stats is not None:
+            stats.start_rule(elements[d])
+        for concept in current_elements[d].concepts & masks["existential"]:
+            if graph.kinds[concept] == EXISTENTIAL:
+                role, filler = graph.args[concept]
                 # 1. If there is an element e with initial concept C assigned, make
                 # e the r-successor of d.
-                for e in current_elements.keys():
-                    if filler in current_elements[e]["initial_concepts"]:
-                        elements[d][f"{role}_successor"].add(e)
-                        successor_found = True
-                        changed = True
+                e = self.initial_elements.get(filler)
+                if e is not None:
+                    changed |= elements.add_successor(d, role, e)
                 # 2. Otherwise, add a new r-successor to d, and assign to it as
                 # initial concept C.
-                if not successor_found and filler in input_concepts:
-                    new_element = f"d{len(elements.keys())}"
-                    elements[d][f"{role}_successor"].add(new_element)
-                    elements[new_element] = {}
-                    elements[new_element]["initial_concepts"] = {filler}
-                    elements[new_element]["concepts"] = {filler}
+                elif filler in input_concepts:
+                    new_element = elements.add_element(filler)
+                    elements.add_successor(d, role, new_element)
+                    self.initial_elements[filler] = new_element
                     changed = True
+        if stats is not None:
+            stats.end_rule("∃1", elements[d], len(current_elements[d].concepts & masks["existential"]))
         if changed:
-            current_elements = copy_elements(elements)
+            current_elements = self.copy_elements(elements)
         changed = False
         # ∃-rule 2: If d has an r-successor with C assigned, add ∃r.C to d
         # only concepts from the input are assigned
-        for prop in current_elements[d].keys():
-            if prop.endswith("successor"):
-                successors = current_elements[d][prop]
-                role = elFactory.getRole(prop.split('_')[0])
-                for successor in successors:
-                    for successor_concept in current_elements[successor]["concepts"]:
-                        ex_role = elFactory.getExistentialRoleRestriction(role, successor_concept)
-                        if ex_role in input_concepts:
-                            elements[d]["concepts"].add(ex_role)
-                            changed = True
-                            if (ex_role not in set().union(*(info["initial_concepts"]
-                                                             for element, info in elements.items()))):
-                                elements[d]["initial_concepts"].add(ex_role)
+        if stats is not None:
+            stats.start_rule(elements[d])
+        for role, successors in current_elements[d].successors.items():
+            for successor in successors:
+                for successor_concept in current_elements[successor].concepts & masks["filler"]:
+                    ex_role = graph.find_existential(role, successor_concept)
+                    if ex_role is not None and ex_role in input_concepts:
+                        elements[d].concepts.add(ex_role)
+                        changed = True
+                        add_initial_concept(elements, self.initial_elements, d, ex_role)
+                # ⊥-rule: If d has an r-successor with ⊥ assigned, add ⊥ to d
+                if graph.bottom in current_elements[successor].concepts:
+                    elements[d].concepts.add(graph.bottom)
+                    changed = True
+                    add_initial_concept(elements, self.initial_elements, d, graph.bottom)
+        if stats is not None:
+            stats.end_rule("∃2", elements[d], sum(len(s) for s in current_elements[d].successors.values()))
         if changed:
-            current_elements = copy_elements(elements)
+            current_elements = self.copy_elements(elements)
         # ⊑-rule: If d has C assigned and C ⊑ D ∈ T, then also assign D to d
-        for axiom in tbox:
-            axiomType = axiom.getClass().getSimpleName()
-            if axiomType == "GeneralConceptInclusion" and axiom.lhs() in current_elements[d]["concepts"]:
-                elements[d]["concepts"].add(axiom.rhs())
-                if (axiom.rhs() not in set().union(*(info["initial_concepts"]
-                                                     for element, info in elements.items()))):
-                    elements[d]["initial_concepts"].add(axiom.rhs())
+        # tbox maps every lhs to its rhs concepts (or the whole told closure), only the axioms
+        # triggered by d's concepts fire and only the concepts d does not have yet are assigned
+        if stats is not None:
+            stats.start_rule(elements[d])
+        for concept in current_elements[d].concepts & masks["told"]:
+            for rhs in tbox[concept] - elements[d].concepts:
+                elements[d].concepts.add(rhs)
+                add_initial_concept(elements, self.initial_elements, d, rhs)
+        if stats is not None:
+            stats.end_rule("⊑", elements[d], len(current_elements[d].concepts & masks["told"]))
 
         return elements
 
+    def unsatisfiable(self, elements):
+        # the class has ⊥, so it is subsumed by every class
+        return self.graph.bottom in elements[0].concepts
+
+    def get_subsumers(self, elements):
+        if self.unsatisfiable(elements):
+            return self.graph.all_class_names()
+        subsumers = set()
+        for c in elements[0].concepts:
+            if self.graph.kinds[c] == NAME and c not in self.graph.fresh_concepts:
+                subsumers.add(self.graph.args[c])
+        return subsumers
+
     def start(self, mode="test"):
-        elFactory = self.ontology.gateway.getELFactory()
-        elements = {"d0": {"initial_concepts": {elFactory.getConceptName(self.class_name)},
-                           "concepts": {elFactory.getConceptName(self.class_name)}}}
+        self.graph = self.get_graph(mode, module=self.module)
+        class_concept = self.graph.find_concept_name(self.class_name)
+        if class_concept is None:
+            # a name that does not occur in the ontology is only subsumed by itself,
+            # it is not added to the concept graph shared with the other queries
+            return {self.class_name}, 0
+        self.rule_masks = self.get_rule_masks(self.graph)
+        elements = ElementStore()
+        self.initial_elements = {class_concept: elements.add_element(class_concept)}
+        tbox = told_sets(self.graph, self.told_closure)
         if mode == "lecture_example":
-            tbox = self.lecture_example_tbox()
-            input_concepts = self.get_input(elements["d0"]["initial_concepts"], tbox)
+            input_concepts = self.get_input(elements[0].initial_concepts, self.graph)
         else:
-            tbox = self.ontology.get_tbox_axioms(replace_equivalent=True)
-            input_concepts = self.ontology.ontology.getSubConcepts()
+            input_concepts = self.graph.input_concepts
 
         if mode == "lecture_example":
             print("Initial state:")
@@ -259,22 +357,22 @@ class ELReasoner:
         changed = True
         while changed:
             i += 1
-            current_elements = copy_elements(elements)
-            for d in elements.keys():
+            current_elements = self.copy_elements(elements)
+            for d in range(len(elements)):
                 total += 1
                 current_elements = self.apply_completion_rules(d, current_elements, tbox, input_concepts)
+                if self.instrumentation is not None:
+                    # the queue of a round are the elements not processed yet
+                    self.instrumentation.step(d, len(current_elements), len(elements) - d - 1)
                 if mode == "lecture_example":
-                    print(f"\n--- {i}.{total}. After applying rules to {d} ---")
+                    print(f"\n--- {i}.{total}. After applying rules to d{d} ---")
                     self.print_elements(current_elements)
-            changed = (elements != current_elements)
+                if self.unsatisfiable(current_elements):
+                    break
+            changed = (elements != current_elements) and not self.unsatisfiable(current_elements)
             elements = current_elements
 
-        subsumers = set()
-        for c in elements["d0"]["concepts"]:
-            c_type = c.getClass().getSimpleName()
-            if c_type == "ConceptName":
-                subsumers.add(c)
-        return subsumers, total
+        return self.get_subsumers(elements), total
 
 
 def main(mode="command_line"):
@@ -289,15 +387,48 @@ def main(mode="command_line"):
     """
     ont_file = ""
     cl_name = ""
+    cache_dir = None
+    loader = "gateway"
+    instrumentation = None
+    module = False
+    told_closure = False
     if mode == "command_line":
         # Parse command-line arguments
         command_line_parser = argparse.ArgumentParser(description='Compute subsumers for a given class in an ontology.')
         command_line_parser.add_argument('ontology_file', type=str, help='Path to the ontology file')
         command_line_parser.add_argument('class_name', type=str,
                                          help='Name of the class for which to compute subsumers')
+        command_line_parser.add_argument('--cache-dir', type=str, default=None,
+                                         help='Directory of the compiled-ontology cache (disabled by default)')
+        command_line_parser.add_argument('--loader', choices=['gateway', 'python'], default='gateway',
+                                         help='Parse the ontology with dl4python (default) or in python without a JVM')
+        command_line_parser.add_argument('--service', type=str, default=None, metavar='HOST:PORT',
+                                         help='Ask a running reasoner_service.py instead of reasoning locally')
+        command_line_parser.add_argument('--profile', action='store_true',
+                                         help='Print statistics of the completion rules to stderr')
+        command_line_parser.add_argument('--no-module', dest='module', action='store_false',
+                                         help='Saturate the whole TBox instead of the locality module of the class')
+        command_line_parser.add_argument('--no-told-closure', dest='told_closure', action='store_false',
+                                         help='Climb the told hierarchy one level per rule application')
         args = command_line_parser.parse_args()
         ont_file = args.ontology_file
         cl_name = args.class_name
+        cache_dir = args.cache_dir
+        loader = args.loader
+        module = args.module
+        told_closure = args.told_closure
+        if args.profile:
+            instrumentation = Instrumentation()
+        if args.service:
+            # imported here, the service module imports this one
+            from reasoner_service import query_service
+            response = query_service(args.service, {"op": "subsumers", "ontology": os.path.abspath(ont_file),
+                                                    "class": cl_name})
+            if "error" in response:
+                sys.exit(response["error"])
+            for concept in response["subsumers"]:
+                print(concept)
+            return
     elif mode == "pizza":
         ont_file = "TestOntologies/pizza.owl"
         cl_name = '"Margherita"'
@@ -306,8 +437,9 @@ def main(mode="command_line"):
         cl_name = "A"
 
     # Compute subsumers
-    ontology = Ontology(ontology_file=ont_file)
-    reasoner = ELReasoner(ontology=ontology, class_name=cl_name)
+    ontology = Ontology(ontology_file=ont_file, cache_dir=cache_dir, loader=loader)
+    reasoner = ELReasoner(ontology=ontology, class_name=cl_name, instrumentation=instrumentation, module=module,
+                          told_closure=told_closure)
     result_subsumers, n_iterations = reasoner.start(mode=mode)
 
     # Display results
@@ -317,6 +449,8 @@ def main(mode="command_line"):
 
     for concept in result_subsumers:
         print(concept)
+    if instrumentation is not None:
+        print(instrumentation.format_report(), file=sys.stderr)
 
 
 if __name__ == "__main__":
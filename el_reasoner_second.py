@@ -1,191 +1,223 @@
-from itertools import combinations
-from collections import deque
 import argparse
-from el_reasoner import copy_elements, Ontology, ELReasoner
+import sys
+from el_reasoner import add_initial_concept, Ontology, ELReasoner
+from concept_graph import CONJUNCTION, EXISTENTIAL
+from element_store import ElementStore
+from instrumentation import Instrumentation
+from schedulers import STRATEGIES, get_scheduler
+from told_hierarchy import told_sets
 
 """
-Run the following command in a terminal before running the code:
+Run the following command in a terminal before running the code
+(not needed with --loader python):
 java -jar dl4python-0.1-jar-with-dependencies.jar
 
 Second algorithm:
 - applies 2 rules in 1 "for" loop instead of 2 separate loops
 - uses a double ended queue for processing elements
+  (other queue strategies can be chosen with --strategy, see schedulers.py)
 """
 
 
-def conjunction_rule_1(input_concepts, elements, d, concept):
+def conjunction_rule_1(graph, input_concepts, elements, initial_elements, d, concept):
     new_concepts_conjuncts = set()
     changed = False
-    for conjunct in concept.getConjuncts():
+    for conjunct in graph.args[concept]:
         if conjunct in input_concepts:
-            elements[d]["concepts"].add(conjunct)
+            elements[d].concepts.add(conjunct)
             new_concepts_conjuncts.add(conjunct)
             changed = True
-            if (conjunct not in set().union(*(info["initial_concepts"]
-                                              for element, info in elements.items()))):
-                elements[d]["initial_concepts"].add(conjunct)
+            add_initial_concept(elements, initial_elements, d, conjunct)
     return elements, new_concepts_conjuncts, changed
 
 
-def existential_rule_1(input_concepts, elements, current_elements, d, concept):
+def existential_rule_1(graph, input_concepts, elements, filler_elements, current_elements, d, concept):
+    """
+    :param filler_elements: concept C -> the element created with C as its initial concept, unlike the initial
+                            concepts derived later, so the reused element does not depend on the processing order
+    """
     new_concepts_existential = set()
     changed = False
-    role = concept.role()
-    filler = concept.filler()
-    if f"{role}_successor" not in current_elements[d]:
-        elements[d][f"{role}_successor"] = set()
-        changed = True
-    successor_found = False
-    # 1. If there is an element e with initial concept C assigned, make
+    role, filler = graph.args[concept]
+    # 1. If there is an element e created for C, make
     # e the r-successor of d.
-    for e in current_elements.keys():
-        if filler in current_elements[e]["initial_concepts"]:
-            elements[d][f"{role}_successor"].add(e)
-            successor_found = True
-            changed = True
+    e = filler_elements.get(filler)
+    if e is not None:
+        changed = elements.add_successor(d, role, e)
     # 2. Otherwise, add a new r-successor to d, and assign to it as
     # initial concept C.
-    if not successor_found and filler in input_concepts:
-        new_element = f"d{len(elements.keys())}"
-        elements[d][f"{role}_successor"].add(new_element)
-        elements[new_element] = {}
-        elements[new_element]["initial_concepts"] = {filler}
-        elements[new_element]["concepts"] = {filler}
+    elif filler in input_concepts:
+        new_element = elements.add_element(filler)
+        elements.add_successor(d, role, new_element)
+        filler_elements[filler] = new_element
         changed = True
     return elements, new_concepts_existential, changed
 
 
 class ELReasoner2(ELReasoner):
+    def __init__(self, ontology, class_name, instrumentation=None, module=False, told_closure=False, strategy="lifo"):
+        super().__init__(ontology, class_name, instrumentation, module, told_closure)
+        # queue strategy of start_2, a key of schedulers.STRATEGIES
+        self.strategy = strategy
+        # scheduler of the last start_2, its stats() count the dequeues
+        self.scheduler = None
+        # concept -> element created for it by ∃-rule 1 (or the class), as in SaturationEngine.element_for
+        self.filler_elements = {}
 
     def apply_completion_rules_2(self, d, elements, tbox, input_concepts):
 
-        elFactory = self.ontology.gateway.getELFactory()
+        graph = self.graph
+        masks = self.rule_masks
+        stats = self.instrumentation
+        initial_elements = self.initial_elements
 
         # ⊤-rule: Add ⊤ to any individual
         # only concepts from the input are assigned
-        top_concept = elFactory.getTop()
+        top_concept = graph.top
+        if stats is not None:
+            stats.start_rule(elements[d])
         if top_concept in input_concepts:
-            elements[d]["concepts"].add(top_concept)
-            if top_concept not in set().union(*(info["initial_concepts"] for element, info in elements.items())):
-                elements[d]["initial_concepts"].add(top_concept)
-        current_elements = copy_elements(elements)
+            elements[d].concepts.add(top_concept)
+            add_initial_concept(elements, initial_elements, d, top_concept)
+        if stats is not None:
+            stats.end_rule("⊤", elements[d], int(top_concept in input_concepts))
+        current_elements = self.copy_elements(elements)
         changed = False
         changed_conj, changed_exist = False, False
         new_concepts_conjuncts = set()
-        for concept in current_elements[d]["concepts"]:
-            conceptType = concept.getClass().getSimpleName()
+        for concept in current_elements[d].concepts & (masks["conjunction"] | masks["existential"]):
+            conceptType = graph.kinds[concept]
             # ⊓-rule 1: If d has C ⊓ D assigned, assign also C and D to d
             # only concepts from the input are assigned
-            if conceptType == "ConceptConjunction":
-                elements, new_concepts_conjuncts, changed_conj = conjunction_rule_1(input_concepts,
-                                                                                    elements, d, concept)
+            # both rules share the loop, so they are timed per application
+            if stats is not None:
+                stats.start_rule(elements[d])
+            if conceptType == CONJUNCTION:
+                elements, new_concepts_conjuncts, changed_conj = conjunction_rule_1(graph, input_concepts,
+                                                                                    elements, initial_elements,
+                                                                                    d, concept)
             # ∃-rule 1: If d has ∃r.C assigned
             # only concepts from the input are assigned
-            elif conceptType == "ExistentialRoleRestriction":
-                elements, new_concepts_existential, changed_exist = existential_rule_1(input_concepts,
-                                                                                       elements, current_elements,
+            elif conceptType == EXISTENTIAL:
+                elements, new_concepts_existential, changed_exist = existential_rule_1(graph, input_concepts,
+                                                                                       elements, self.filler_elements,
+                                                                                       current_elements,
                                                                                        d, concept)
+            if stats is not None:
+                stats.end_rule("⊓1" if conceptType == CONJUNCTION else "∃1", elements[d], 1)
         new_changed_exist = False
         for new_conjunct in new_concepts_conjuncts:
-            new_conjunct_conceptType = new_conjunct.getClass().getSimpleName()
-            if new_conjunct_conceptType == "ExistentialRoleRestriction":
-                elements, new_concepts_existential, new_changed_exist = existential_rule_1(input_concepts,
-                                                                                           elements, current_elements,
+            if graph.kinds[new_conjunct] == EXISTENTIAL:
+                if stats is not None:
+                    stats.start_rule(elements[d])
+                elements, new_concepts_existential, new_changed_exist = existential_rule_1(graph, input_concepts,
+                                                                                           elements,
+                                                                                           self.filler_elements,
+                                                                                           current_elements,
                                                                                            d, new_conjunct)
+                if stats is not None:
+                    stats.end_rule("∃1", elements[d], 1)
         if changed_conj or changed_exist or new_changed_exist:
-            current_elements = copy_elements(elements)
+            current_elements = self.copy_elements(elements)
         # ⊓-rule 2: If d has C and D assigned, assign also C ⊓ D to d
         # only concepts from the input are assigned
-        for pair in combinations(current_elements[d]["concepts"], 2):
-            conjunction_opt1 = elFactory.getConjunction(pair[0], pair[1])
-            conjunction_opt2 = elFactory.getConjunction(pair[1], pair[0])
-            if conjunction_opt1 in input_concepts:
-                elements[d]["concepts"].add(conjunction_opt1)
-                changed = True
-                if (conjunction_opt1 not in set().union(*(info["initial_concepts"]
-                                                          for element, info in elements.items()))):
-                    elements[d]["initial_concepts"].add(conjunction_opt1)
-            elif conjunction_opt2 in input_concepts:
-                elements[d]["concepts"].add(conjunction_opt2)
-                changed = True
-                if (conjunction_opt2 not in set().union(*(info["initial_concepts"]
-                                                          for element, info in elements.items()))):
-                    elements[d]["initial_concepts"].add(conjunction_opt2)
+        # only conjunctions occurring in the ontology are checked, through the conjunct index
+        if stats is not None:
+            stats.start_rule(elements[d])
+        for concept in current_elements[d].concepts & masks["conjunct"]:
+            for partner, conjunction in graph.conjunctions_with.get(concept, ()):
+                if partner in current_elements[d].concepts and conjunction in input_concepts:
+                    elements[d].concepts.add(conjunction)
+                    changed = True
+                    add_initial_concept(elements, initial_elements, d, conjunction)
+        if stats is not None:
+            stats.end_rule("⊓2", elements[d], len(current_elements[d].concepts & masks["conjunct"]))
         if changed:
-            current_elements = copy_elements(elements)
+            current_elements = self.copy_elements(elements)
         changed = False
         # ∃-rule 2: If d has an r-successor with C assigned, add ∃r.C to d
         # only concepts from the input are assigned
-        for prop in current_elements[d].keys():
-            if prop.endswith("successor"):
-                successors = current_elements[d][prop]
-                role = elFactory.getRole(prop.split('_')[0])
-                for successor in successors:
-                    for successor_concept in current_elements[successor]["concepts"]:
-                        ex_role = elFactory.getExistentialRoleRestriction(role, successor_concept)
-                        if ex_role in input_concepts:
-                            elements[d]["concepts"].add(ex_role)
-                            changed = True
-                            if (ex_role not in set().union(*(info["initial_concepts"]
-                                                             for element, info in elements.items()))):
-                                elements[d]["initial_concepts"].add(ex_role)
+        if stats is not None:
+            stats.start_rule(elements[d])
+        for role, successors in current_elements[d].successors.items():
+            for successor in successors:
+                for successor_concept in current_elements[successor].concepts & masks["filler"]:
+                    ex_role = graph.find_existential(role, successor_concept)
+                    if ex_role is not None and ex_role in input_concepts:
+                        elements[d].concepts.add(ex_role)
+                        changed = True
+                        add_initial_concept(elements, initial_elements, d, ex_role)
+                # ⊥-rule: If d has an r-successor with ⊥ assigned, add ⊥ to d
+                if graph.bottom in current_elements[successor].concepts:
+                    elements[d].concepts.add(graph.bottom)
+                    changed = True
+                    add_initial_concept(elements, initial_elements, d, graph.bottom)
+        if stats is not None:
+            stats.end_rule("∃2", elements[d], sum(len(s) for s in current_elements[d].successors.values()))
         if changed:
-            current_elements = copy_elements(elements)
+            current_elements = self.copy_elements(elements)
         # ⊑-rule: If d has C assigned and C ⊑ D ∈ T, then also assign D to d
-        for axiom in tbox:
-            axiomType = axiom.getClass().getSimpleName()
-            if axiomType == "GeneralConceptInclusion" and axiom.lhs() in current_elements[d]["concepts"]:
-                elements[d]["concepts"].add(axiom.rhs())
-                if (axiom.rhs() not in set().union(*(info["initial_concepts"]
-                                                     for element, info in elements.items()))):
-                    elements[d]["initial_concepts"].add(axiom.rhs())
+        # tbox maps every lhs to its rhs concepts (or the whole told closure), only the axioms
+        # triggered by d's concepts fire and only the concepts d does not have yet are assigned
+        if stats is not None:
+            stats.start_rule(elements[d])
+        for concept in current_elements[d].concepts & masks["told"]:
+            for rhs in tbox[concept] - elements[d].concepts:
+                elements[d].concepts.add(rhs)
+                add_initial_concept(elements, initial_elements, d, rhs)
+        if stats is not None:
+            stats.end_rule("⊑", elements[d], len(current_elements[d].concepts & masks["told"]))
 
         return elements
 
     def start_2(self, mode="test"):
-        elFactory = self.ontology.gateway.getELFactory()
-        elements = {"d0": {"initial_concepts": {elFactory.getConceptName(self.class_name)},
-                           "concepts": {elFactory.getConceptName(self.class_name)}}}
+        self.graph = self.get_graph(mode, module=self.module)
+        class_concept = self.graph.find_concept_name(self.class_name)
+        if class_concept is None:
+            # a name that does not occur in the ontology is only subsumed by itself,
+            # it is not added to the concept graph shared with the other queries
+            return {self.class_name}, 0
+        self.rule_masks = self.get_rule_masks(self.graph)
+        elements = ElementStore()
+        self.initial_elements = {class_concept: elements.add_element(class_concept)}
+        self.filler_elements = {class_concept: 0}
+        tbox = told_sets(self.graph, self.told_closure)
         if mode == "lecture_example":
-            tbox = self.lecture_example_tbox()
-            input_concepts = self.get_input(elements["d0"]["initial_concepts"], tbox)
+            input_concepts = self.get_input(elements[0].initial_concepts, self.graph)
         else:
-            tbox = self.ontology.get_tbox_axioms(replace_equivalent=True)
-            input_concepts = self.ontology.ontology.getSubConcepts()
+            input_concepts = self.graph.input_concepts
 
         if mode == "lecture_example":
             print("Initial state:")
             self.print_elements(elements)
 
         total = 0
-        dequeue = deque()
-        dequeue.append(list(elements.keys())[0])
+        self.scheduler = get_scheduler(self.strategy)
+        self.scheduler.add(0)
         without_change = 0
-        while without_change != len(elements.keys()):
+        # an unsatisfiable class has every subsumer, so the loop stops as soon as it gets ⊥
+        while not self.scheduler.finished(without_change, len(elements)) and not self.unsatisfiable(elements):
             total += 1
-            current_elements = copy_elements(elements)
-            current_d = dequeue.pop()
+            current_elements = self.copy_elements(elements)
+            current_d = self.scheduler.pop()
             current_elements = self.apply_completion_rules_2(current_d, current_elements, tbox, input_concepts)
             if mode == "lecture_example":
-                print(f"\n--- {total}. After applying rules to {current_d} ---")
+                print(f"\n--- {total}. After applying rules to d{current_d} ---")
                 self.print_elements(current_elements)
-            for new_element in set(current_elements.keys()) - set(elements.keys()):
-                dequeue.append(new_element)
-            if elements[current_d]["concepts"] == current_elements[current_d]["concepts"]:
-                dequeue.appendleft(current_d)
-            else:
-                dequeue.append(current_d)
-            if current_elements == elements:
-                without_change += 1
-            else:
-                without_change = 0
+            # new elements get the next ids
+            for new_element in range(len(elements), len(current_elements)):
+                self.scheduler.add(new_element)
+            self.scheduler.processed(current_d, elements[current_d], current_elements)
+            if self.instrumentation is not None:
+                self.instrumentation.step(current_d, len(current_elements), len(self.scheduler))
+            # only the strategies that stop after a sweep without change compare the whole model
+            if self.scheduler.sweeps:
+                if current_elements == elements:
+                    without_change += 1
+                else:
+                    without_change = 0
             elements = current_elements
-        subsumers = set()
-        for c in elements["d0"]["concepts"]:
-            c_type = c.getClass().getSimpleName()
-            if c_type == "ConceptName":
-                subsumers.add(c)
-        return subsumers, total
+        return self.get_subsumers(elements), total
 
 
 def main(mode="command_line"):
@@ -200,15 +232,40 @@ def main(mode="command_line"):
     """
     ont_file = ""
     cl_name = ""
+    cache_dir = None
+    loader = "gateway"
+    instrumentation = None
+    module = False
+    told_closure = False
+    strategy = "lifo"
     if mode == "command_line":
         # Parse command-line arguments
         command_line_parser = argparse.ArgumentParser(description='Compute subsumers for a given class in an ontology.')
         command_line_parser.add_argument('ontology_file', type=str, help='Path to the ontology file')
         command_line_parser.add_argument('class_name', type=str,
                                          help='Name of the class for which to compute subsumers')
+        command_line_parser.add_argument('--cache-dir', type=str, default=None,
+                                         help='Directory of the compiled-ontology cache (disabled by default)')
+        command_line_parser.add_argument('--loader', choices=['gateway', 'python'], default='gateway',
+                                         help='Parse the ontology with dl4python (default) or in python without a JVM')
+        command_line_parser.add_argument('--profile', action='store_true',
+                                         help='Print statistics of the completion rules to stderr')
+        command_line_parser.add_argument('--no-module', dest='module', action='store_false',
+                                         help='Saturate the whole TBox instead of the locality module of the class')
+        command_line_parser.add_argument('--no-told-closure', dest='told_closure', action='store_false',
+                                         help='Climb the told hierarchy one level per rule application')
+        command_line_parser.add_argument('--strategy', choices=sorted(STRATEGIES), default='lifo',
+                                         help='Order in which the elements are processed (default: lifo)')
         args = command_line_parser.parse_args()
         ont_file = args.ontology_file
         cl_name = args.class_name
+        cache_dir = args.cache_dir
+        loader = args.loader
+        module = args.module
+        told_closure = args.told_closure
+        strategy = args.strategy
+        if args.profile:
+            instrumentation = Instrumentation()
     elif mode == "pizza":
         ont_file = "TestOntologies/pizza.owl"
         cl_name = '"Margherita"'
@@ -217,8 +274,9 @@ def main(mode="command_line"):
         cl_name = "A"
 
     # Compute subsumers
-    ontology = Ontology(ontology_file=ont_file)
-    reasoner = ELReasoner2(ontology=ontology, class_name=cl_name)
+    ontology = Ontology(ontology_file=ont_file, cache_dir=cache_dir, loader=loader)
+    reasoner = ELReasoner2(ontology=ontology, class_name=cl_name, instrumentation=instrumentation, module=module,
+                           told_closure=told_closure, strategy=strategy)
     result_subsumers, n_iterations = reasoner.start_2(mode=mode)
 
     # Display results
@@ -228,6 +286,9 @@ def main(mode="command_line"):
 
     for concept in result_subsumers:
         print(concept)
+    if instrumentation is not None:
+        print(instrumentation.format_report(), file=sys.stderr)
+        print(f"queue: {reasoner.scheduler.stats()}", file=sys.stderr)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,226 @@
+import argparse
+from el_reasoner import Ontology, ELReasoner
+from saturation import SaturationEngine
+
+"""
+Run the following command in a terminal before running the code
+(not needed with --loader python):
+java -jar dl4python-0.1-jar-with-dependencies.jar
+
+Third algorithm:
+- keeps a todo queue of newly derived concepts per element (worklist / semi-naive saturation)
+- rules only fire on new facts, elements are never copied or compared
+- stops when all todo queues are empty, or as soon as the class gets ⊥ (then it has every subsumer)
+- works on the TBox in EL normal form by default
+- GCIs and equivalences can be added and removed without starting over (add_axioms / remove_axioms),
+  axioms of the ontology itself can only be removed from the TBox as it is given (normalized=False)
+- yes/no questions A ⊑ B stop as soon as the answer is known (is_subsumed / is_subsumed_batch)
+"""
+
+
+def axiom_gcis(gcis, equivalences):
+    return list(gcis) + [gci for conceptA, conceptB in equivalences
+                         for gci in [(conceptA, conceptB), (conceptB, conceptA)]]
+
+
+def subsumption_answers(engine, pairs):
+    """
+    Answer yes/no subsumption questions on a saturation engine, the candidate subsumers of a class
+    are checked together (see SaturationEngine.subsumed_by).
+    :param pairs: (sub class name, super class name) pairs
+    :return: list of booleans, in the order of the pairs
+    """
+    graph = engine.graph
+    candidates = {}
+    for sub_class, super_class in pairs:
+        # a name that does not occur in the ontology subsumes nothing but itself and is only subsumed
+        # by itself, it is answered without adding it to the shared graph
+        sub_concept = graph.find_concept_name(sub_class)
+        super_concept = graph.find_concept_name(super_class)
+        if sub_concept is not None and super_concept is not None:
+            candidates.setdefault(sub_concept, set()).add(super_concept)
+    subsumers = {}
+    for sub_concept, concepts in candidates.items():
+        subsumers[graph.args[sub_concept]] = {graph.args[concept]
+                                              for concept in engine.subsumed_by(sub_concept, concepts)}
+    return [sub_class == super_class or super_class in subsumers.get(sub_class, ()) for sub_class, super_class in pairs]
+
+
+class ELReasoner3(ELReasoner):
+    def __init__(self, ontology, class_name=None, normalized=True, module=False):
+        super().__init__(ontology, class_name, module=module)
+        # saturate the TBox in EL normal form, so labels mostly consist of concept names
+        self.normalized = normalized
+        # saturation shared by all queries on the ontology's concept graph
+        self.engine = None
+
+    def get_engine(self, mode="test", module=False):
+        graph = self.get_graph(mode, normalized=self.normalized, module=module)
+        if mode == "lecture_example":
+            return SaturationEngine(graph, self.get_input({graph.concept_name(self.class_name)}, graph))
+        if module:
+            # the module only answers queries for this class, it is not kept for other queries
+            return SaturationEngine(graph)
+        if self.engine is None or self.engine.graph is not graph:
+            self.engine = SaturationEngine(graph)
+        return self.engine
+
+    def start_3(self, mode="test"):
+        engine = self.get_engine(mode, module=self.module)
+        self.graph = engine.graph
+        class_concept = self.graph.find_concept_name(self.class_name)
+        if class_concept is None:
+            # a name that does not occur in the ontology is only subsumed by itself
+            return {self.class_name}, 0
+        # elements of earlier queries are reused, only new facts are processed
+        total_before = engine.total
+        element = engine.element_for(class_concept)
+        if mode == "lecture_example":
+            print("Initial state:")
+            self.print_elements(engine.as_store())
+
+        # an unsatisfiable class has every subsumer, saturation stops as soon as it gets ⊥
+        total = engine.saturate(goal=(element, None)) - total_before
+        if mode == "lecture_example":
+            print(f"\n--- After processing {total} facts ---")
+            self.print_elements(engine.as_store())
+        return engine.subsumers(class_concept), total
+
+    def add_axioms(self, gcis=(), equivalences=()):
+        """
+        Add GCIs and equivalences to the saturated TBox, only their new consequences are computed.
+        :param gcis: (lhs, rhs) pairs of concepts of the engine's graph
+                     (ConceptGraph.axiom_gcis translates dl4python axioms)
+        :param equivalences: (C, D) pairs of concepts, added as C ⊑ D and D ⊑ C
+        :return: names of the classes whose subsumers changed
+        """
+        engine = self.get_engine()
+        self.graph = engine.graph
+        return self.class_names(engine.add_gcis(axiom_gcis(gcis, equivalences)))
+
+    def remove_axioms(self, gcis=(), equivalences=()):
+        """
+        Remove GCIs and equivalences from the TBox, the affected part of the saturation is recomputed.
+        :return: names of the classes whose subsumers changed
+        """
+        engine = self.get_engine()
+        self.graph = engine.graph
+        return self.class_names(engine.remove_gcis(axiom_gcis(gcis, equivalences)))
+
+    def is_subsumed(self, sub_class, super_class):
+        """
+        :return: True if sub_class ⊑ super_class follows from the ontology
+        """
+        return self.is_subsumed_batch([(sub_class, super_class)])[0]
+
+    def is_subsumed_batch(self, pairs):
+        """
+        Answer many yes/no questions on the saturation shared by all queries on the ontology.
+        :param pairs: (sub class name, super class name) pairs
+        :return: list of booleans, in the order of the pairs
+        """
+        engine = self.get_engine()
+        self.graph = engine.graph
+        return subsumption_answers(engine, pairs)
+
+    def class_names(self, concepts):
+        return {self.graph.args[concept] for concept in concepts if self.engine.is_subsumer(concept)}
+
+    def classify(self, mode="test"):
+        """
+        Compute the subsumers of every concept name of the ontology in one shared saturation.
+        :return: dictionary class name -> set of subsumer names, number of processed facts
+        """
+        engine = self.get_engine(mode)
+        self.graph = engine.graph
+        total_before = engine.total
+        concept_names = self.graph.concept_names()
+        for concept in concept_names:
+            engine.element_for(concept)
+        total = engine.saturate() - total_before
+        return {self.graph.args[concept]: engine.subsumers(concept) for concept in concept_names}, total
+
+
+def main(mode="command_line"):
+    """
+    :param mode:
+        "command_line" (default): subsumers will be printed in a format 1 class name per line
+                                  use this command: python el_reasoner_third.py ONTOLOGY_FILE CLASS_NAME
+                                  or with --classify instead of CLASS_NAME to classify the whole ontology
+        All other modes can be used to test the code:
+        "pizza": subsumers and its total number will be printed for pizza.owl ontology for '"Margherita"' class name
+        "lecture_example": intermediate steps of the algorithm and class name, subsumers and its total number will
+                           be printed for an example from Lecture 5 (slide 13)
+    """
+    ont_file = ""
+    cl_name = ""
+    cache_dir = None
+    loader = "gateway"
+    module = False
+    super_classes = []
+    if mode == "command_line":
+        # Parse command-line arguments
+        command_line_parser = argparse.ArgumentParser(description='Compute subsumers for a given class in an ontology.')
+        command_line_parser.add_argument('ontology_file', type=str, help='Path to the ontology file')
+        command_line_parser.add_argument('class_name', type=str, nargs='?',
+                                         help='Name of the class for which to compute subsumers')
+        command_line_parser.add_argument('--classify', action='store_true',
+                                         help='Compute subsumers for all class names in one run')
+        command_line_parser.add_argument('--subsumed-by', type=str, nargs='+', default=None, metavar='SUPER_CLASS',
+                                         help='Only check whether CLASS_NAME is subsumed by these classes')
+        command_line_parser.add_argument('--cache-dir', type=str, default=None,
+                                         help='Directory of the compiled-ontology cache (disabled by default)')
+        command_line_parser.add_argument('--loader', choices=['gateway', 'python'], default='gateway',
+                                         help='Parse the ontology with dl4python (default) or in python without a JVM')
+        command_line_parser.add_argument('--no-module', dest='module', action='store_false',
+                                         help='Saturate the whole TBox instead of the locality module of the class')
+        args = command_line_parser.parse_args()
+        if args.class_name is None and not args.classify:
+            command_line_parser.error("either CLASS_NAME or --classify is required")
+        ont_file = args.ontology_file
+        cl_name = args.class_name
+        cache_dir = args.cache_dir
+        loader = args.loader
+        module = args.module
+        if args.classify:
+            mode = "classify"
+        elif args.subsumed_by:
+            super_classes = args.subsumed_by
+            mode = "subsumed_by"
+    elif mode == "pizza":
+        ont_file = "TestOntologies/pizza.owl"
+        cl_name = '"Margherita"'
+    elif mode == "lecture_example":
+        ont_file = "TestOntologies/pizza.owl"
+        cl_name = "A"
+
+    # Compute subsumers
+    ontology = Ontology(ontology_file=ont_file, cache_dir=cache_dir, loader=loader)
+    reasoner = ELReasoner3(ontology=ontology, class_name=cl_name, module=module)
+    if mode == "classify":
+        classification, n_iterations = reasoner.classify()
+        # 1 class name per line, followed by its subsumers
+        for class_name, subsumers in classification.items():
+            print(f"{class_name}: {', '.join(sorted(subsumers))}")
+        return
+    if mode == "subsumed_by":
+        # 1 super class name per line, followed by the answer
+        for super_class, answer in zip(super_classes,
+                                       reasoner.is_subsumed_batch([(cl_name, name) for name in super_classes])):
+            print(f"{super_class}: {'yes' if answer else 'no'}")
+        return
+    result_subsumers, n_iterations = reasoner.start_3(mode=mode)
+
+    # Display results
+    if mode != "command_line":
+        print(f"Subsumers for {cl_name}:")
+        print(f"({len(result_subsumers)} in total)")
+
+    for concept in result_subsumers:
+        print(concept)
+
+
+if __name__ == "__main__":
+    # mode = "pizza" / "lecture_example" / "command_line"
+    # command example: python el_reasoner_third.py TestOntologies/amino-acid.amino-acid-ontology.2.owl.xml I
+    main(mode="command_line")
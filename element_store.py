@@ -0,0 +1,73 @@
+from bitset import ConceptSet
+
+"""
+Elements of the model built by the completion rules.
+
+Elements are numbered 0, 1, 2, ... in the order they are created (printed as d0, d1, d2, ...) and
+kept in a list. Every element stores its successors and predecessors per role id in both directions,
+so the r-successors or r-predecessors of an element are found with a single dict lookup.
+"""
+
+NO_ELEMENTS = frozenset()
+
+
+class Element:
+    __slots__ = ("initial_concepts", "concepts", "successors", "predecessors")
+
+    def __init__(self, initial_concept=None):
+        self.initial_concepts = ConceptSet() if initial_concept is None else ConceptSet([initial_concept])
+        self.concepts = self.initial_concepts.copy()
+        # role -> set of element ids
+        self.successors = {}
+        self.predecessors = {}
+
+    def copy(self):
+        copied = Element.__new__(Element)
+        copied.initial_concepts = self.initial_concepts.copy()
+        copied.concepts = self.concepts.copy()
+        # most elements have few or no edges, the comprehensions are skipped for them
+        copied.successors = {role: set(successors) for role, successors in self.successors.items()} \
+            if self.successors else {}
+        copied.predecessors = {role: set(predecessors) for role, predecessors in self.predecessors.items()} \
+            if self.predecessors else {}
+        return copied
+
+    def __eq__(self, other):
+        # the predecessors mirror the successors and do not need to be compared
+        return (isinstance(other, Element) and self.concepts == other.concepts
+                and self.initial_concepts == other.initial_concepts and self.successors == other.successors)
+
+    __hash__ = None
+
+
+class ElementStore(list):
+    # a list of Elements indexed by element id, indexing and iteration stay at list speed
+    __slots__ = ()
+
+    def add_element(self, initial_concept):
+        """
+        :return: the id of a new element with the initial concept assigned
+        """
+        self.append(Element(initial_concept))
+        return len(self) - 1
+
+    def add_successor(self, d, role, e):
+        """
+        Make element e an r-successor of element d.
+        :return: True if the edge is new
+        """
+        successors = self[d].successors.setdefault(role, set())
+        if e in successors:
+            return False
+        successors.add(e)
+        self[e].predecessors.setdefault(role, set()).add(d)
+        return True
+
+    def successors(self, d, role):
+        return self[d].successors.get(role, NO_ELEMENTS)
+
+    def predecessors(self, e, role):
+        return self[e].predecessors.get(role, NO_ELEMENTS)
+
+    def copy(self):
+        return ElementStore([element.copy() for element in self])
@@ -20,3 +20,37 @@ def test_elk(ontology_file, class_name):
     subsumers.remove('⊤')
 
     return subsumers
+
+
+class ELKClassification:
+    # reference subsumers of all classes of an already parsed ontology from a single elk.classify(),
+    # test_elk parses the file and sets the ontology again for every class
+    def __init__(self, ontology, java_gateway=None):
+        """
+        :param ontology: ontology parsed in the JVM, e.g. Ontology.ontology
+        :param java_gateway: gateway the ontology was parsed with, the module gateway by default
+        """
+        self.gateway = gateway if java_gateway is None else java_gateway
+        self.formatter = self.gateway.getSimpleDLFormatter()
+        self.elk = self.gateway.getELKReasoner()
+        self.elk.setOntology(ontology)
+        # class name -> formatted names of its subsumers
+        self.subsumers = {}
+        for concept, subsumers in self.elk.classify().items():
+            self.subsumers[self.formatter.format(concept)] = [self.formatter.format(x) for x in subsumers]
+
+    def get_subsumers(self, class_name):
+        """
+        :return: the subsumers of the class in the format of test_elk (with the class itself, without ⊤)
+        """
+        if class_name in self.subsumers:
+            subsumers = list(self.subsumers[class_name])
+            if class_name not in subsumers:
+                subsumers.append(class_name)
+        else:
+            # not a key of the classification, asked from the already set up reasoner
+            concept = self.gateway.getELFactory().getConceptName(class_name)
+            subsumers = [self.formatter.format(x) for x in self.elk.getSubsumers(concept).toArray()]
+        if '⊤' in subsumers:
+            subsumers.remove('⊤')
+        return subsumers
@@ -1,25 +1,17 @@
+import argparse
 from el_reasoner import Ontology, ELReasoner
 from el_reasoner_second import ELReasoner2
-from elk import test_elk, reformat
-from py4j.java_gateway import JavaGateway
+from elk import ELKClassification
+from gateway_pool import GatewayPool
 from os import listdir
-from os.path import isfile, join
+from os.path import abspath, isfile, join
+from ontology_cache import file_hash
+from results_store import ResultsStore
 import time
-import csv
 
 results_file = 'results.csv'
-
-
-def add_row_to_csv(file_path, data):
-    with open(file_path, 'a', newline='') as csvfile:
-        fieldnames = ['file', 'class', 'reasoner', 'iterations', 'time', 'n_subsumers', 'subsumers']
-        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
-
-        # If the file is empty, write the header
-        if csvfile.tell() == 0:
-            writer.writeheader()
-
-        writer.writerow(data)
+results_store = 'results.sqlite'
+cache_dir = '.ontology_cache'
 
 
 def find_subsumers(start_reasoner, ont_name, cl_name):
@@ -27,7 +19,7 @@ def find_subsumers(start_reasoner, ont_name, cl_name):
     result_subsumers, n_iterations = start_reasoner()
     end_time = time.time()
     execution_time = round(end_time - start_time, 4)
-    result_subsumers = reformat(result_subsumers)
+    result_subsumers = list(result_subsumers)
     print(f"Subsumers for {ont_name} / {cl_name}:")
     print(f"({len(result_subsumers)} in total)")
     print(result_subsumers)
@@ -37,33 +29,76 @@ def find_subsumers(start_reasoner, ont_name, cl_name):
 
 
 def main():
-    gateway = JavaGateway()
-    parser = gateway.getOWLParser()
+    command_line_parser = argparse.ArgumentParser(description='Compare the reasoners on the test ontologies.')
+    command_line_parser.add_argument('--gateway-ports', type=int, nargs='+', default=None,
+                                     help='Ports of a gateway pool computing the ELK subsumers in the background '
+                                          '(one ELK classification in the main gateway by default)')
+    command_line_parser.add_argument('--gateway-command', type=str, default=None,
+                                     help='Command starting a gateway of the pool, {port} is replaced by its port')
+    args = command_line_parser.parse_args()
+
     path = "TestOntologies/"
     test_files = [path + f for f in listdir(path) if isfile(join(path, f))]
-    for file in test_files:
-        ontology = parser.parseFile(file)
-        gateway.convertToBinaryConjunctions(ontology)
-        conceptNames = ontology.getConceptNames()
-        n_names = len(conceptNames)
-        n = 0
-        if n_names < 150:
-            n = 30
-        elif n_names < 300:
-            n = 20
-        elif n_names < 600:
-            n = 10
-        elif n_names > 900:
-            n = 1
-        conceptNames = reformat(conceptNames)[:n]
-        ontology_file = file
-        ontology = Ontology(ontology_file=ontology_file)
-        ontology_name = file.split('/')[1].split('.')[0]
-        for class_name in conceptNames:
-            reasoner_1 = ELReasoner(ontology=ontology, class_name=class_name)
-            reasoner_2 = ELReasoner2(ontology=ontology, class_name=class_name)
+    pool = None
+    if args.gateway_ports:
+        pool = GatewayPool(args.gateway_ports, command=args.gateway_command)
+    try:
+        # finished (file, class, reasoner) combinations of an interrupted run are skipped on the next run
+        with ResultsStore(results_store) as store:
+            # the export rewrites results.csv, so the rows it already has are taken over by a new store
+            if store.empty() and isfile(results_file):
+                store.import_csv(results_file)
+            for file in test_files:
+                evaluate_file(file, store, pool)
+                # the rows of older engine versions are exported as well
+                store.export_csv(results_file)
+    finally:
+        if pool is not None:
+            pool.close()
+
+
+def evaluate_file(file, store, pool=None):
+    """
+    :param pool: gateway_pool.GatewayPool answering the ELK queries in its own JVMs while reasoners 1 and 2
+                 run, None to classify with ELK in the gateway of the ontology
+    """
+    ontology_file = file
+    ontology_hash = file_hash(ontology_file)
+    # a finished file is skipped before the JVM parses it
+    if store.file_finished(ontology_hash):
+        return
+    done = store.completed(ontology_hash)
+    # the ontology is parsed once: the concept names, ELK and reasoners 1 and 2 all use this object,
+    # and with a cache hit the concept graph is not even pulled across the gateway
+    ontology = Ontology(ontology_file=ontology_file, cache_dir=cache_dir)
+    conceptNames = ontology.ontology.getConceptNames()
+    n_names = len(conceptNames)
+    n = 0
+    if n_names < 150:
+        n = 30
+    elif n_names < 300:
+        n = 20
+    elif n_names < 600:
+        n = 10
+    elif n_names > 900:
+        n = 1
+    conceptNames = [ontology.formatter.format(x) for x in conceptNames][:n]
+    ontology_name = file.split('/')[1].split('.')[0]
+    # one classification serves the reference subsumers of every class of the file,
+    # it is skipped when all of them are stored already
+    elk = None
+    elk_classes = [class_name for class_name in conceptNames if (class_name, 3) not in done]
+    # with a pool all ELK queries are submitted at once, the results are taken in the order of the classes
+    elk_futures = {}
+    if pool is not None:
+        # the JVMs of the pool may run in another working directory
+        elk_futures = {class_name: pool.submit(abspath(ontology_file), class_name) for class_name in elk_classes}
+    elif elk_classes:
+        elk = ELKClassification(ontology.ontology, ontology.gateway)
+    for class_name in conceptNames:
+        if (class_name, 3) not in done:
             print("--------------------- ELK ---------------------")
-            s3 = test_elk(ontology_file=ontology_file, class_name=class_name)
+            s3 = elk_futures[class_name].result() if pool is not None else elk.get_subsumers(class_name)
             print(f"Subsumers for {ontology_name} / {class_name}:")
             print(f"({len(s3)} in total)")
             print(s3)
@@ -74,8 +109,10 @@ def main():
                         'time': None,
                         'n_subsumers': len(s3),
                         'subsumers': s3}
-            add_row_to_csv(results_file, data_elk)
+            store.add(ontology_hash, data_elk)
+        if (class_name, 1) not in done:
             print("----------------- REASONER 1 -----------------")
+            reasoner_1 = ELReasoner(ontology=ontology, class_name=class_name)
             s1, i1, t1 = find_subsumers(reasoner_1.start, ontology_name, class_name)
             data_1 = {'file': ontology_file,
                       'class': class_name,
@@ -84,8 +121,10 @@ def main():
                       'time': t1,
                       'n_subsumers': len(s1),
                       'subsumers': s1}
-            add_row_to_csv(results_file, data_1)
+            store.add(ontology_hash, data_1)
+        if (class_name, 2) not in done:
             print("----------------- REASONER 2 -----------------")
+            reasoner_2 = ELReasoner2(ontology=ontology, class_name=class_name)
             s2, i2, t2 = find_subsumers(reasoner_2.start_2, ontology_name, class_name)
             data_2 = {'file': ontology_file,
                       'class': class_name,
@@ -94,8 +133,11 @@ def main():
                       'time': t2,
                       'n_subsumers': len(s2),
                       'subsumers': s2}
-            add_row_to_csv(results_file, data_2)
+            store.add(ontology_hash, data_2)
+    # flushes the rows, the next run skips the file
+    store.finish_file(ontology_hash)
 
 
 if __name__ == "__main__":
+    # command example: python evaluation.py --gateway-ports 25334 25335 --gateway-command "java -jar dl4python-0.1-jar-with-dependencies.jar {port}"
     main()
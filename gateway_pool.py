@@ -0,0 +1,266 @@
+import argparse
+import queue
+import shlex
+import socket
+import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from py4j.java_gateway import JavaGateway, GatewayParameters
+from py4j.protocol import Py4JError
+
+"""
+Pool of dl4python gateways on different local ports, for running ELK / HermiT reference queries
+concurrently (with each other and with the python reasoners).
+
+The pool attaches to JVMs that are already listening on the given ports, and if a start command is
+given, starts the missing ones itself, for example:
+    --command "java -jar dl4python-0.1-jar-with-dependencies.jar {port}"
+where {port} is replaced by the port the gateway has to listen on. Every connection is used by one
+worker at a time. Connections that were idle for a while are health-checked before they are handed
+out (and by an optional monitor thread), and broken ones are recycled: closed, their JVM restarted
+if the pool started it, and reconnected. A connection that cannot be restarted stays in the pool
+closed, as a placeholder the next acquire tries to restart again, so no port is ever lost.
+"""
+
+DEFAULT_PORT = 25333
+REFERENCE_REASONERS = {"elk": "getELKReasoner", "hermit": "getHermiTReasoner"}
+
+
+def port_open(port, host="127.0.0.1"):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as connection:
+        connection.settimeout(0.5)
+        return connection.connect_ex((host, port)) == 0
+
+
+class GatewayConnection:
+    def __init__(self, port, process=None):
+        self.port = port
+        # JVM started by the pool, None if the pool attached to a running one
+        self.process = process
+        self.last_used = time.monotonic()
+        self.closed = False
+        self.gateway = JavaGateway(gateway_parameters=GatewayParameters(port=port))
+        self.parser = self.gateway.getOWLParser()
+        self.formatter = self.gateway.getSimpleDLFormatter()
+        self.elFactory = self.gateway.getELFactory()
+        # ontology file -> parsed ontology, each file is parsed once per JVM
+        self.ontologies = {}
+        # (reasoner, ontology file) -> reference reasoner with the ontology set
+        self.reasoners = {}
+
+    def alive(self):
+        try:
+            self.gateway.jvm.System.currentTimeMillis()
+            return True
+        except Py4JError:
+            return False
+
+    def get_ontology(self, ontology_file):
+        ontology = self.ontologies.get(ontology_file)
+        if ontology is None:
+            ontology = self.parser.parseFile(ontology_file)
+            self.ontologies[ontology_file] = ontology
+        return ontology
+
+    def get_reasoner(self, reasoner, ontology_file):
+        key = (reasoner, ontology_file)
+        reference = self.reasoners.get(key)
+        if reference is None:
+            reference = getattr(self.gateway, REFERENCE_REASONERS[reasoner])()
+            reference.setOntology(self.get_ontology(ontology_file))
+            self.reasoners[key] = reference
+        return reference
+
+    def subsumers(self, reasoner, ontology_file, class_name):
+        # in the format of elk.test_elk: formatted names without ⊤
+        reference = self.get_reasoner(reasoner, ontology_file)
+        subsumers = reference.getSubsumers(self.elFactory.getConceptName(class_name)).toArray()
+        subsumers = [self.formatter.format(x) for x in subsumers]
+        if '⊤' in subsumers:
+            subsumers.remove('⊤')
+        return subsumers
+
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            self.gateway.close()
+        except Py4JError:
+            pass
+        if self.process is not None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+class GatewayPool:
+    def __init__(self, ports=(DEFAULT_PORT,), command=None, health_check_after=30.0, startup_timeout=60.0):
+        """
+        :param ports: local ports of the gateways, one connection per port
+        :param command: command template ({port} is replaced) to start a JVM on a port nobody listens on,
+                        None to only attach to running JVMs
+        :param health_check_after: seconds of idleness after which a connection is checked before use
+        :param startup_timeout: seconds to wait for a started JVM to accept connections
+        """
+        self.command = command
+        self.health_check_after = health_check_after
+        self.startup_timeout = startup_timeout
+        self.idle = queue.Queue()
+        self.lock = threading.Lock()
+        self.connections = []
+        self.executor = None
+        self.monitor = None
+        self.closed = False
+        try:
+            for port in ports:
+                connection = self.open(port)
+                self.connections.append(connection)
+                self.idle.put(connection)
+        except BaseException:
+            # the gateways and JVMs of the ports opened so far would be leaked
+            for connection in self.connections:
+                connection.close()
+            raise
+
+    def __len__(self):
+        return len(self.connections)
+
+    def open(self, port):
+        process = None
+        if self.command is not None and not port_open(port):
+            process = subprocess.Popen(shlex.split(self.command.format(port=port)),
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            deadline = time.monotonic() + self.startup_timeout
+            while not port_open(port):
+                if process.poll() is not None or time.monotonic() > deadline:
+                    process.kill()
+                    raise RuntimeError(f"could not start a gateway on port {port}")
+                time.sleep(0.2)
+        try:
+            return GatewayConnection(port, process)
+        except Py4JError:
+            if process is not None:
+                process.kill()
+            raise
+
+    def recycle(self, connection):
+        connection.close()
+        new_connection = self.open(connection.port)
+        with self.lock:
+            self.connections[self.connections.index(connection)] = new_connection
+        return new_connection
+
+    def broken(self, connection):
+        return connection.closed or (time.monotonic() - connection.last_used > self.health_check_after
+                                     and not connection.alive())
+
+    def acquire(self):
+        connection = self.idle.get()
+        if self.broken(connection):
+            try:
+                connection = self.recycle(connection)
+            except (RuntimeError, OSError, Py4JError) as error:
+                # the closed connection goes back as a placeholder, otherwise its port would be lost
+                # and a pool with one port would block forever
+                self.idle.put(connection)
+                raise RuntimeError(f"could not restart the gateway on port {connection.port}: {error}") from error
+        return connection
+
+    def release(self, connection):
+        connection.last_used = time.monotonic()
+        self.idle.put(connection)
+
+    @contextmanager
+    def connection(self):
+        connection = self.acquire()
+        try:
+            yield connection
+        except Py4JError:
+            # a failed call may have broken the connection, it is closed here and restarted by the
+            # next acquire, which reports a failing restart instead of losing the connection
+            if not connection.alive():
+                connection.close()
+            raise
+        finally:
+            self.release(connection)
+
+    def check_idle(self):
+        # health check of the connections nobody is using right now
+        for _ in range(self.idle.qsize()):
+            try:
+                connection = self.idle.get_nowait()
+            except queue.Empty:
+                break
+            if self.broken(connection):
+                try:
+                    connection = self.recycle(connection)
+                except (RuntimeError, OSError, Py4JError):
+                    # stays as a placeholder, the next acquire retries and raises the error
+                    pass
+            self.idle.put(connection)
+
+    def start_monitor(self, interval=None):
+        def run():
+            while not self.closed:
+                time.sleep(interval or self.health_check_after)
+                if not self.closed:
+                    self.check_idle()
+
+        self.monitor = threading.Thread(target=run, daemon=True)
+        self.monitor.start()
+
+    def reference_subsumers(self, ontology_file, class_name, reasoner="elk"):
+        with self.connection() as connection:
+            return connection.subsumers(reasoner, ontology_file, class_name)
+
+    def submit(self, ontology_file, class_name, reasoner="elk"):
+        """
+        Start a reference query in the background, one query per JVM runs at a time.
+        :return: Future of the list of subsumer names
+        """
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=len(self.connections))
+        return self.executor.submit(self.reference_subsumers, ontology_file, class_name, reasoner)
+
+    def close(self):
+        self.closed = True
+        if self.executor is not None:
+            self.executor.shutdown()
+        for connection in self.connections:
+            connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main():
+    command_line_parser = argparse.ArgumentParser(description='Compute reference subsumers with several JVMs.')
+    command_line_parser.add_argument('ontology_file', type=str, help='Path to the ontology file')
+    command_line_parser.add_argument('class_names', type=str, nargs='+', help='Names of the classes')
+    command_line_parser.add_argument('--ports', type=int, nargs='+', default=[DEFAULT_PORT],
+                                     help='Ports of the gateways')
+    command_line_parser.add_argument('--command', type=str, default=None,
+                                     help='Command starting a gateway, {port} is replaced by its port')
+    command_line_parser.add_argument('--reasoner', choices=sorted(REFERENCE_REASONERS), default='elk',
+                                     help='Reference reasoner')
+    args = command_line_parser.parse_args()
+
+    with GatewayPool(args.ports, command=args.command) as pool:
+        futures = {pool.submit(args.ontology_file, class_name, args.reasoner): class_name
+                   for class_name in args.class_names}
+        # 1 class name per line, followed by its subsumers, in the order the queries finish
+        for future in as_completed(futures):
+            print(f"{futures[future]}: {', '.join(sorted(future.result()))}")
+
+
+if __name__ == "__main__":
+    # command example: python gateway_pool.py TestOntologies/pizza.owl '"Margherita"' '"American"' --ports 25333 25334
+    main()
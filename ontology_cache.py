@@ -0,0 +1,167 @@
+import hashlib
+import mmap
+import os
+import struct
+from array import array
+from concept_graph import ConceptGraph, NAME, TOP, CONJUNCTION, EXISTENTIAL, BOTTOM
+
+"""
+On-disk cache of preprocessed ontologies.
+
+The concept graph and its normalized version are written to a compact binary file named after
+the SHA-256 hash of the ontology file, so later runs can load them without the java gateway.
+Layout (all integers are 32 bit, native byte order):
+    header: magic, version, number of graphs
+    per graph: counts, then the arrays kinds / first argument / second argument of every concept,
+               the GCIs as (lhs, rhs) pairs, input concepts, fresh concepts,
+               and the \0-separated concept names and role names
+    skipped constructs of the python loader: size, then \0-separated "construct\tcount" entries,
+               so the loader's report is not lost on a cache hit
+"""
+
+MAGIC = b"ELCG"
+VERSION = 4
+HEADER = struct.Struct("=4sii")
+COUNTS = struct.Struct("=7i")
+SIZE = struct.Struct("=i")
+
+
+def file_hash(file_path):
+    sha = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def cache_path(ontology_file, cache_dir, variant="gateway"):
+    # graphs built by different loaders are cached separately
+    return os.path.join(cache_dir, f"{file_hash(ontology_file)}.{variant}.elcg")
+
+
+def pad(data):
+    return data + b"\0" * (-len(data) % 4)
+
+
+def encode_graph(graph):
+    # names are stored once in a string table, concept arguments point into it
+    names = []
+    kinds = array("i", graph.kinds)
+    first = array("i", bytes(4 * len(graph)))
+    second = array("i", bytes(4 * len(graph)))
+    for concept, kind in enumerate(graph.kinds):
+        if kind == NAME:
+            first[concept] = len(names)
+            names.append(graph.args[concept])
+        elif kind == CONJUNCTION or kind == EXISTENTIAL:
+            first[concept], second[concept] = graph.args[concept]
+    gcis = array("i", [concept for gci in graph.gcis for concept in gci])
+    input_concepts = array("i", sorted(graph.input_concepts))
+    fresh_concepts = array("i", sorted(graph.fresh_concepts))
+    names = pad("\0".join(names).encode("utf-8"))
+    roles = pad("\0".join(graph.roles).encode("utf-8"))
+    counts = COUNTS.pack(len(graph), len(graph.roles), len(graph.gcis), len(input_concepts),
+                         len(fresh_concepts), len(names), len(roles))
+    return b"".join([counts, kinds.tobytes(), first.tobytes(), second.tobytes(), gcis.tobytes(),
+                     input_concepts.tobytes(), fresh_concepts.tobytes(), names, roles])
+
+
+def decode_graph(buffer, offset):
+    n_concepts, n_roles, n_gcis, n_input, n_fresh, names_size, roles_size = COUNTS.unpack_from(buffer, offset)
+    offset += COUNTS.size
+
+    def ints(count):
+        nonlocal offset
+        values = buffer[offset:offset + 4 * count].cast("i")
+        offset += 4 * count
+        return values
+
+    kinds, first, second = ints(n_concepts), ints(n_concepts), ints(n_concepts)
+    gcis, input_concepts, fresh_concepts = ints(2 * n_gcis), ints(n_input), ints(n_fresh)
+    names = bytes(buffer[offset:offset + names_size]).rstrip(b"\0").decode("utf-8").split("\0")
+    offset += names_size
+    roles = bytes(buffer[offset:offset + roles_size]).rstrip(b"\0").decode("utf-8").split("\0")
+    offset += roles_size
+
+    # replay the interning in id order, which also rebuilds the lookup tables and indexes
+    graph = ConceptGraph()
+    for role in roles[:n_roles]:
+        graph.role(role)
+    for concept in range(n_concepts):
+        kind = kinds[concept]
+        if kind == NAME:
+            interned = graph.concept_name(names[first[concept]])
+        elif kind == TOP:
+            interned = graph.top
+        elif kind == BOTTOM:
+            interned = graph.bottom
+        elif kind == CONJUNCTION:
+            interned = graph.conjunction(first[concept], second[concept])
+        else:
+            interned = graph.existential(first[concept], second[concept])
+        if interned != concept:
+            raise ValueError("corrupted ontology cache")
+    for i in range(n_gcis):
+        graph.add_gci(gcis[2 * i], gcis[2 * i + 1])
+    graph.input_concepts = set(input_concepts)
+    graph.fresh_concepts = set(fresh_concepts)
+    return graph, offset
+
+
+def encode_skipped(skipped):
+    entries = pad("\0".join(f"{construct}\t{count}" for construct, count in sorted(skipped.items())).encode("utf-8"))
+    return SIZE.pack(len(entries)) + entries
+
+
+def decode_skipped(buffer, offset):
+    size, = SIZE.unpack_from(buffer, offset)
+    offset += SIZE.size
+    entries = bytes(buffer[offset:offset + size]).rstrip(b"\0").decode("utf-8")
+    skipped = {}
+    for entry in entries.split("\0") if entries else ():
+        construct, count = entry.rsplit("\t", 1)
+        skipped[construct] = int(count)
+    return skipped
+
+
+def save_graphs(ontology_file, cache_dir, graphs, variant="gateway", skipped=None):
+    """
+    :param skipped: constructs skipped by the loader -> number of occurrences
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    path = cache_path(ontology_file, cache_dir, variant)
+    # write to a temporary file first so a crash never leaves a half written cache behind
+    with open(path + ".tmp", "wb") as file:
+        file.write(HEADER.pack(MAGIC, VERSION, len(graphs)))
+        for graph in graphs:
+            file.write(encode_graph(graph))
+        file.write(encode_skipped(skipped or {}))
+    os.replace(path + ".tmp", path)
+    return path
+
+
+def load_graphs(ontology_file, cache_dir, variant="gateway"):
+    """
+    :return: the cached graphs of the ontology file and the constructs the loader skipped,
+             or None if there is no (valid) cache entry
+    """
+    path = cache_path(ontology_file, cache_dir, variant)
+    if not os.path.exists(path) or os.path.getsize(path) < HEADER.size:
+        return None
+    with open(path, "rb") as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        buffer = memoryview(mapped)
+        try:
+            magic, version, n_graphs = HEADER.unpack_from(buffer, 0)
+            if magic != MAGIC or version != VERSION:
+                return None
+            graphs = []
+            offset = HEADER.size
+            for _ in range(n_graphs):
+                graph, offset = decode_graph(buffer, offset)
+                graphs.append(graph)
+            skipped = decode_skipped(buffer, offset)
+        except (ValueError, TypeError, struct.error):
+            return None
+        finally:
+            buffer.release()
+    return graphs, skipped
@@ -0,0 +1,406 @@
+import xml.etree.ElementTree as ET
+from collections import Counter
+from concept_graph import ConceptGraph
+
+"""
+Pure python loader for the EL fragment of OWL/XML and RDF/XML ontologies, a JVM-free
+alternative to parsing with dl4python.
+
+The file is read with an incremental XML parser, every top-level axiom is translated as soon as
+it is complete and then discarded. Class expressions are kept as small tuples until the end
+of the file, when concept names are known and the concept graph is built:
+    ("top",), ("bottom",), ("name", iri), ("and", (C1, ..., Cn)), ("or", (C1, ..., Cn)), ("some", role iri, C),
+    ("individual", iri), ("only", role iri, C)
+Constructs outside of EL are skipped and counted in OWLLoader.skipped. On the right hand side of
+an axiom unsupported conjuncts are dropped, and a union on the left hand side is split into one
+axiom per disjunct, which keeps every remaining consequence sound. Disjoint classes C, D become
+C ⊓ D ⊑ ⊥. A value restriction r value a (owl:hasValue, ObjectHasValue) becomes ∃r.{a}, and like
+in the concept graph of the gateway the nominal {a} and every restriction ∀r.C are atomic concepts,
+the same expression is always the same atom and atoms are never reported as subsumers.
+"""
+
+OWL = "http://www.w3.org/2002/07/owl#"
+RDF = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+RDFS = "http://www.w3.org/2000/01/rdf-schema#"
+XML = "http://www.w3.org/XML/1998/namespace"
+
+TOP = ("top",)
+BOTTOM = ("bottom",)
+
+
+def tag_iri(tag):
+    # "{namespace}name" tags of ElementTree as IRIs
+    return tag[1:].replace("}", "", 1) if tag.startswith("{") else tag
+
+
+def local_name(iri):
+    # concept names are the IRI fragments, as printed by the dl4python formatter
+    for separator in "#/:":
+        if separator in iri:
+            return iri.rsplit(separator, 1)[1]
+    return iri
+
+
+class OWLLoader:
+    def __init__(self):
+        # (sub, super) pairs of class expressions
+        self.axioms = []
+        # declared or used class IRIs, in order of appearance
+        self.classes = {}
+        # IRI -> english label
+        self.labels = {}
+        # construct -> number of times it was skipped
+        self.skipped = Counter()
+
+    def load(self, ontology_file):
+        with open(ontology_file, "rb") as file:
+            start = file.read(4096).decode("utf-8", errors="ignore")
+        if "<rdf:RDF" in start or RDF + "RDF" in start:
+            self.load_rdf_xml(ontology_file)
+        else:
+            self.load_owl_xml(ontology_file)
+        return self.build_graph()
+
+    # ---------------------------------------------------------------- OWL/XML
+
+    def load_owl_xml(self, ontology_file):
+        prefixes = {}
+        base = ""
+        root = None
+        depth = 0
+        for event, element in ET.iterparse(ontology_file, events=("start", "end")):
+            if event == "start":
+                if depth == 0:
+                    root = element
+                    base = element.get("{%s}base" % XML) or element.get("ontologyIRI") or ""
+                depth += 1
+                continue
+            depth -= 1
+            if depth != 1:
+                continue
+            # a complete top-level element
+            tag = element.tag.split("}")[-1]
+            if tag == "Prefix":
+                prefixes[element.get("name")] = element.get("IRI")
+            else:
+                self.owl_xml_axiom(tag, element, prefixes, base)
+            # processed elements are dropped to keep memory bounded
+            root.clear()
+
+    def owl_xml_iri(self, element, prefixes, base):
+        iri = element.get("IRI")
+        if iri is not None:
+            return base + iri if iri.startswith("#") else iri
+        prefix, _, name = element.get("abbreviatedIRI", "").partition(":")
+        return prefixes.get(prefix, prefix + ":") + name
+
+    def owl_xml_axiom(self, tag, element, prefixes, base):
+        children = list(element)
+        if tag == "Declaration":
+            for entity in children:
+                if entity.tag.split("}")[-1] == "Class":
+                    self.classes.setdefault(self.owl_xml_iri(entity, prefixes, base), None)
+        elif tag == "SubClassOf":
+            expressions = [c for c in children if not c.tag.endswith("}Annotation")]
+            self.add_axiom(self.owl_xml_concept(expressions[0], prefixes, base),
+                           self.owl_xml_concept(expressions[1], prefixes, base))
+        elif tag == "EquivalentClasses":
+            expressions = [self.owl_xml_concept(c, prefixes, base)
+                           for c in children if not c.tag.endswith("}Annotation")]
+            for first, second in zip(expressions, expressions[1:]):
+                self.add_axiom(first, second)
+                self.add_axiom(second, first)
+        elif tag == "DisjointClasses":
+            self.add_disjoint([self.owl_xml_concept(c, prefixes, base)
+                               for c in children if not c.tag.endswith("}Annotation")])
+        elif tag == "AnnotationAssertion":
+            parts = {child.tag.split("}")[-1]: child for child in children}
+            prop = parts.get("AnnotationProperty")
+            if (prop is not None and "IRI" in parts and "Literal" in parts
+                    and self.owl_xml_iri(prop, prefixes, base) == RDFS + "label"):
+                subject = (parts["IRI"].text or "").strip()
+                subject = base + subject if subject.startswith("#") else subject
+                self.add_label(subject, parts["Literal"].text or "",
+                               parts["Literal"].get("{%s}lang" % XML))
+        elif tag not in ("Annotation", "Import"):
+            self.skipped[tag] += 1
+
+    def owl_xml_concept(self, element, prefixes, base):
+        tag = element.tag.split("}")[-1]
+        if tag == "Class":
+            iri = self.owl_xml_iri(element, prefixes, base)
+            return self.class_concept(iri)
+        if tag == "ObjectIntersectionOf":
+            return ("and", tuple(self.owl_xml_concept(child, prefixes, base) for child in element))
+        if tag == "ObjectUnionOf":
+            return ("or", tuple(self.owl_xml_concept(child, prefixes, base) for child in element))
+        if tag == "ObjectSomeValuesFrom":
+            role, filler = list(element)
+            if role.tag.split("}")[-1] != "ObjectProperty":
+                return ("unsupported", "ObjectInverseOf")
+            return ("some", self.owl_xml_iri(role, prefixes, base), self.owl_xml_concept(filler, prefixes, base))
+        if tag == "ObjectAllValuesFrom":
+            role, filler = list(element)
+            if role.tag.split("}")[-1] != "ObjectProperty":
+                return ("unsupported", "ObjectInverseOf")
+            return ("only", self.owl_xml_iri(role, prefixes, base), self.owl_xml_concept(filler, prefixes, base))
+        if tag == "ObjectHasValue":
+            role, individual = list(element)
+            if role.tag.split("}")[-1] != "ObjectProperty":
+                return ("unsupported", "ObjectInverseOf")
+            if individual.tag.split("}")[-1] != "NamedIndividual":
+                return ("unsupported", "AnonymousIndividual")
+            return ("some", self.owl_xml_iri(role, prefixes, base),
+                    ("individual", self.owl_xml_iri(individual, prefixes, base)))
+        return ("unsupported", tag)
+
+    # ---------------------------------------------------------------- RDF/XML
+
+    def load_rdf_xml(self, ontology_file):
+        # blank node id -> node element, for rdf:nodeID references
+        self.blank_nodes = {}
+        root = None
+        depth = 0
+        pending = []
+        for event, element in ET.iterparse(ontology_file, events=("start", "end")):
+            if event == "start":
+                if depth == 0:
+                    root = element
+                depth += 1
+                continue
+            depth -= 1
+            if depth != 1:
+                continue
+            # a complete node element directly below rdf:RDF
+            node_id = element.get("{%s}nodeID" % RDF)
+            if node_id is not None:
+                self.blank_nodes[node_id] = element
+                pending.append(element)
+            else:
+                self.rdf_node(element)
+            # processed elements are dropped to keep memory bounded
+            root.clear()
+        for element in pending:
+            self.rdf_node(element)
+        self.blank_nodes = {}
+
+    def rdf_subject(self, element):
+        about = element.get("{%s}about" % RDF)
+        if about is None and element.get("{%s}ID" % RDF) is not None:
+            about = "#" + element.get("{%s}ID" % RDF)
+        return about
+
+    def rdf_node(self, element):
+        tag = tag_iri(element.tag)
+        subject = self.rdf_subject(element)
+        types = {prop.get("{%s}resource" % RDF) for prop in element if tag_iri(prop.tag) == RDF + "type"}
+        if tag == OWL + "AllDisjointClasses" or OWL + "AllDisjointClasses" in types:
+            members = [prop for prop in element if tag_iri(prop.tag) == OWL + "members"]
+            if members:
+                self.add_disjoint([self.rdf_member(member) for member in members[0]])
+            else:
+                self.skipped["AllDisjointClasses"] += 1
+            return
+        if tag == OWL + "Class" and subject is not None:
+            self.classes.setdefault(subject, None)
+        if tag in (OWL + "Class", RDF + "Description") and subject is not None:
+            concept = self.class_concept(subject)
+            for prop in element:
+                prop_tag = tag_iri(prop.tag)
+                if prop_tag == RDFS + "subClassOf":
+                    self.add_axiom(concept, self.rdf_object(prop))
+                elif prop_tag == OWL + "equivalentClass":
+                    other = self.rdf_object(prop)
+                    self.add_axiom(concept, other)
+                    self.add_axiom(other, concept)
+                elif prop_tag == OWL + "intersectionOf" or prop_tag == OWL + "unionOf":
+                    other = self.rdf_concept(element)
+                    self.add_axiom(concept, other)
+                    self.add_axiom(other, concept)
+                elif prop_tag == RDFS + "label":
+                    self.add_label(subject, prop.text or "", prop.get("{%s}lang" % XML))
+                elif prop_tag == OWL + "disjointWith":
+                    self.add_disjoint([concept, self.rdf_object(prop)])
+                elif prop_tag in (OWL + "complementOf", OWL + "oneOf"):
+                    self.skipped[prop_tag.split("#")[-1]] += 1
+        elif tag == OWL + "Restriction":
+            self.skipped[tag.split("#")[-1]] += 1
+        elif tag not in (OWL + "Ontology", OWL + "ObjectProperty", OWL + "DatatypeProperty",
+                         OWL + "AnnotationProperty", OWL + "NamedIndividual", OWL + "Class",
+                         RDF + "Description", OWL + "Thing"):
+            self.skipped[local_name(tag)] += 1
+
+    def rdf_object(self, prop):
+        resource = prop.get("{%s}resource" % RDF)
+        if resource is not None:
+            return self.class_concept(resource)
+        node_id = prop.get("{%s}nodeID" % RDF)
+        if node_id is not None:
+            node = self.blank_nodes.get(node_id)
+            return self.rdf_concept(node) if node is not None else ("unsupported", "nodeID")
+        children = list(prop)
+        if len(children) != 1:
+            return ("unsupported", local_name(tag_iri(prop.tag)))
+        return self.rdf_concept(children[0])
+
+    def rdf_concept(self, element):
+        subject = self.rdf_subject(element)
+        parts = {tag_iri(prop.tag): prop for prop in element}
+        for operator, kind in ((OWL + "intersectionOf", "and"), (OWL + "unionOf", "or")):
+            if operator in parts:
+                return (kind, tuple(self.rdf_member(member) for member in parts[operator]))
+        if tag_iri(element.tag) == OWL + "Restriction":
+            if OWL + "onProperty" in parts and OWL + "someValuesFrom" in parts:
+                role = parts[OWL + "onProperty"].get("{%s}resource" % RDF)
+                if role is None:
+                    return ("unsupported", "ObjectInverseOf")
+                return ("some", role, self.rdf_object(parts[OWL + "someValuesFrom"]))
+            if OWL + "onProperty" in parts and OWL + "allValuesFrom" in parts:
+                role = parts[OWL + "onProperty"].get("{%s}resource" % RDF)
+                if role is None:
+                    return ("unsupported", "ObjectInverseOf")
+                return ("only", role, self.rdf_object(parts[OWL + "allValuesFrom"]))
+            if OWL + "onProperty" in parts and OWL + "hasValue" in parts:
+                role = parts[OWL + "onProperty"].get("{%s}resource" % RDF)
+                individual = parts[OWL + "hasValue"].get("{%s}resource" % RDF)
+                if role is None:
+                    return ("unsupported", "ObjectInverseOf")
+                # a literal value restricts a data property
+                if individual is None:
+                    return ("unsupported", "hasValue")
+                return ("some", role, ("individual", individual))
+            restriction = [tag.split("#")[-1] for tag in parts if tag != OWL + "onProperty"]
+            return ("unsupported", restriction[0] if restriction else "Restriction")
+        if subject is not None:
+            return self.class_concept(subject)
+        unsupported = [tag.split("#")[-1] for tag in parts]
+        return ("unsupported", unsupported[0] if unsupported else local_name(tag_iri(element.tag)))
+
+    def rdf_member(self, member):
+        # a member of an rdf:parseType="Collection" list
+        if self.rdf_subject(member) is None:
+            return self.rdf_concept(member)
+        return self.class_concept(self.rdf_subject(member))
+
+    # ---------------------------------------------------------------- graph
+
+    def class_concept(self, iri):
+        if iri == OWL + "Thing":
+            return TOP
+        if iri == OWL + "Nothing":
+            return BOTTOM
+        self.classes.setdefault(iri, None)
+        return ("name", iri)
+
+    def add_label(self, iri, label, language):
+        # the dl4python formatter prints english labels (quoted), other classes by their IRI fragment
+        if language == "en" and iri not in self.labels:
+            self.labels[iri] = f'"{label}"'
+
+    def add_axiom(self, lhs, rhs):
+        # (C1 ⊔ ... ⊔ Cn) ⊑ D is the same as Ci ⊑ D for every i
+        if lhs[0] == "or":
+            for disjunct in lhs[1]:
+                self.add_axiom(disjunct, rhs)
+        else:
+            self.axioms.append((lhs, rhs))
+
+    def add_disjoint(self, concepts):
+        # C and D are disjoint: C ⊓ D ⊑ ⊥ for every pair
+        for i, first in enumerate(concepts):
+            for second in concepts[i + 1:]:
+                self.add_axiom(("and", (first, second)), BOTTOM)
+
+    def name(self, iri):
+        if iri in self.labels:
+            return self.labels[iri]
+        return local_name(iri)
+
+    def build_graph(self):
+        graph = ConceptGraph()
+        for iri in self.classes:
+            graph.concept_name(self.name(iri))
+        for lhs, rhs in self.axioms:
+            lhs = self.translate(graph, lhs, weaken=False)
+            # ⊥ ⊑ D holds anyway
+            if lhs is None or lhs == graph.bottom:
+                continue
+            rhs = self.translate(graph, rhs, weaken=True)
+            if rhs is not None and rhs != graph.top:
+                graph.add_gci(lhs, rhs)
+        graph.input_concepts = graph.sub_concepts(concept for gci in graph.gcis for concept in gci)
+        return graph
+
+    def translate(self, graph, concept, weaken):
+        """
+        :param weaken: drop unsupported conjuncts (sound on the right hand side of an axiom),
+                       otherwise return None for unsupported concepts
+        """
+        kind = concept[0]
+        if kind == "top":
+            return graph.top
+        if kind == "bottom":
+            return graph.bottom
+        if kind == "name":
+            return graph.concept_name(self.name(concept[1]))
+        if kind == "individual" or kind == "only":
+            atom_name = self.atom_name(concept)
+            if atom_name is None:
+                self.skipped["ObjectAllValuesFrom"] += 1
+                return None
+            atom = graph.concept_name(atom_name)
+            graph.fresh_concepts.add(atom)
+            return atom
+        if kind == "and":
+            conjuncts = [self.translate(graph, conjunct, weaken) for conjunct in concept[1]]
+            if None in conjuncts and not weaken:
+                return None
+            conjuncts = [conjunct for conjunct in conjuncts if conjunct is not None]
+            if not conjuncts:
+                return None
+            result = conjuncts[0]
+            for conjunct in conjuncts[1:]:
+                result = graph.conjunction(result, conjunct)
+            return result
+        if kind == "some":
+            filler = self.translate(graph, concept[2], weaken)
+            if filler is None:
+                if not weaken:
+                    return None
+                filler = graph.top
+            return graph.existential(graph.role(self.name(concept[1])), filler)
+        # a union is only supported on the left hand side of an axiom (see add_axiom)
+        self.skipped["ObjectUnionOf" if kind == "or" else concept[1]] += 1
+        return None
+
+    def atom_name(self, concept):
+        # name of the atomic concept of a nominal or ∀-restriction, None if it contains unsupported constructs
+        kind = concept[0]
+        if kind == "top":
+            return "⊤"
+        if kind == "bottom":
+            return "⊥"
+        if kind == "name":
+            return self.name(concept[1])
+        if kind == "individual":
+            return "{" + self.name(concept[1]) + "}"
+        if kind == "and" or kind == "or":
+            operands = [self.atom_name(operand) for operand in concept[1]]
+            if None in operands:
+                return None
+            return "(" + (" ⊓ " if kind == "and" else " ⊔ ").join(operands) + ")"
+        if kind == "some" or kind == "only":
+            filler = self.atom_name(concept[2])
+            if filler is None:
+                return None
+            return ("∃" if kind == "some" else "∀") + self.name(concept[1]) + "." + filler
+        return None
+
+
+def load_ontology(ontology_file):
+    """
+    :return: the concept graph of the EL fragment of the ontology, and the skipped constructs
+    """
+    loader = OWLLoader()
+    graph = loader.load(ontology_file)
+    return graph, loader.skipped
@@ -0,0 +1,80 @@
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from el_reasoner import Ontology
+from saturation import SaturationEngine
+
+"""
+Parallel subsumer queries for many class names of one ontology.
+
+The preprocessed (normalized) concept graph is handed to every worker process once, through the
+pool initializer: with the default fork start method on Linux it is inherited without pickling,
+otherwise it is pickled once per worker and never per task. Each worker keeps its own saturation
+engine, so elements are shared by all queries of the chunks it processes.
+"""
+
+# saturation engine of the current worker process
+worker_engine = None
+
+
+def init_worker(graph):
+    global worker_engine
+    worker_engine = SaturationEngine(graph)
+
+
+def query_chunk(class_names):
+    results = []
+    for class_name in class_names:
+        concept = worker_engine.graph.find_concept_name(class_name)
+        if concept is None:
+            # a name that does not occur in the ontology is only subsumed by itself, it is not added
+            results.append((class_name, {class_name}))
+            continue
+        worker_engine.element_for(concept)
+        worker_engine.saturate()
+        results.append((class_name, worker_engine.subsumers(concept)))
+    return results
+
+
+def parallel_subsumers(graph, class_names, workers=None, chunk_size=16):
+    """
+    Compute the subsumers of the class names in a process pool.
+    :param graph: concept graph the queries are answered on
+    :param workers: number of worker processes, os.cpu_count() if None
+    :param chunk_size: number of class names sent to a worker in one task
+    :return: generator of (class name, set of subsumer names), in the order the queries finish
+    """
+    class_names = list(class_names)
+    chunks = [class_names[i:i + chunk_size] for i in range(0, len(class_names), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers, initializer=init_worker, initargs=(graph,)) as executor:
+        futures = [executor.submit(query_chunk, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            yield from future.result()
+
+
+def main():
+    command_line_parser = argparse.ArgumentParser(description='Compute subsumers for many classes in parallel.')
+    command_line_parser.add_argument('ontology_file', type=str, help='Path to the ontology file')
+    command_line_parser.add_argument('class_names', type=str, nargs='*',
+                                     help='Names of the classes, all class names of the ontology if omitted')
+    command_line_parser.add_argument('--workers', type=int, default=os.cpu_count(),
+                                     help='Number of worker processes')
+    command_line_parser.add_argument('--chunk-size', type=int, default=16,
+                                     help='Number of class names per task')
+    command_line_parser.add_argument('--cache-dir', type=str, default=None,
+                                     help='Directory of the compiled-ontology cache (disabled by default)')
+    command_line_parser.add_argument('--loader', choices=['gateway', 'python'], default='gateway',
+                                     help='Parse the ontology with dl4python (default) or in python without a JVM')
+    args = command_line_parser.parse_args()
+
+    ontology = Ontology(ontology_file=args.ontology_file, cache_dir=args.cache_dir, loader=args.loader)
+    graph = ontology.get_normalized_graph()
+    class_names = args.class_names or [graph.args[concept] for concept in graph.concept_names()]
+    # 1 class name per line, followed by its subsumers, as soon as they are computed
+    for class_name, subsumers in parallel_subsumers(graph, class_names, args.workers, args.chunk_size):
+        print(f"{class_name}: {', '.join(sorted(subsumers))}", flush=True)
+
+
+if __name__ == "__main__":
+    # command example: python parallel.py TestOntologies/pizza.owl --workers 8 --chunk-size 32
+    main()
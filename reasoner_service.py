@@ -0,0 +1,286 @@
+import argparse
+import json
+import os
+import socket
+import socketserver
+import sys
+import threading
+from collections import OrderedDict
+from el_reasoner import Ontology
+from el_reasoner_third import axiom_gcis, subsumption_answers
+from saturation import SaturationEngine
+
+"""
+Long-lived reasoner service: ontologies are loaded once and subsumer queries are answered over a
+local TCP socket or stdin/stdout, one JSON object per line.
+
+Requests:
+    {"op": "subsumers", "ontology": FILE, "class": CLASS_NAME}
+    {"op": "is_subsumed", "ontology": FILE, "pairs": [[SUB_CLASS, SUPER_CLASS], ...]}
+    {"op": "load", "ontology": FILE}
+    {"op": "update", "ontology": FILE, "add": [AXIOM, ...], "remove": [AXIOM, ...]}
+    {"op": "stats"}
+Responses are JSON objects as well, {"error": MESSAGE} if a request fails.
+
+Axioms are ["gci", C, D] (C ⊑ D) or ["equivalence", C, D], concepts are a class name, "⊤", "⊥",
+["and", C, D, ...] or ["some", ROLE, C]. An update only recomputes the affected part of the
+saturation, and only the cached results of the classes whose subsumers changed are dropped.
+"""
+
+DEFAULT_ADDRESS = "localhost:8765"
+
+
+class LRUCache:
+    def __init__(self, maxsize=10000):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return self.entries[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def discard(self, key):
+        self.entries.pop(key, None)
+
+    def stats(self):
+        return {"size": len(self.entries), "maxsize": self.maxsize,
+                "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+
+class ReasonerService:
+    def __init__(self, cache_size=10000, cache_dir=None, loader="gateway"):
+        self.cache_dir = cache_dir
+        self.loader = loader
+        # ontology file -> saturation engine on its concept graph, kept between queries
+        # (not normalized, so that axioms of the ontology can be removed by updates)
+        self.engines = {}
+        # (ontology file, class name) -> sorted subsumer names
+        self.results = LRUCache(cache_size)
+        # the engines are not thread safe
+        self.lock = threading.Lock()
+
+    def get_engine(self, ontology_file):
+        # relative and absolute paths of the same file share one engine
+        ontology_file = os.path.abspath(ontology_file)
+        engine = self.engines.get(ontology_file)
+        if engine is None:
+            ontology = Ontology(ontology_file=ontology_file, cache_dir=self.cache_dir, loader=self.loader)
+            engine = SaturationEngine(ontology.get_concept_graph())
+            self.engines[ontology_file] = engine
+        return engine
+
+    def subsumers(self, ontology_file, class_name):
+        ontology_file = os.path.abspath(ontology_file)
+        key = (ontology_file, class_name)
+        subsumers = self.results.get(key)
+        if subsumers is not None:
+            return subsumers, True
+        engine = self.get_engine(ontology_file)
+        concept = engine.graph.find_concept_name(class_name)
+        if concept is None:
+            # a name that does not occur in the ontology is only subsumed by itself, it is not added
+            return [class_name], False
+        engine.element_for(concept)
+        engine.saturate()
+        subsumers = sorted(engine.subsumers(concept))
+        self.results.put(key, subsumers)
+        return subsumers, False
+
+    def is_subsumed(self, ontology_file, pairs):
+        # yes/no questions stop saturating early, their answers are not cached
+        return subsumption_answers(self.get_engine(ontology_file), [tuple(pair) for pair in pairs])
+
+    def update(self, ontology_file, added, removed):
+        ontology_file = os.path.abspath(ontology_file)
+        engine = self.get_engine(ontology_file)
+        graph = engine.graph
+        # both lists are parsed before the engine is changed, so a malformed request changes nothing,
+        # removed axioms only consist of concepts of the graph
+        removed_gcis = axioms_from_json(graph, removed, known_only=True)
+        added_gcis = axioms_from_json(graph, added)
+        changed = set()
+        try:
+            if removed_gcis:
+                changed |= engine.remove_gcis(removed_gcis)
+            if added_gcis:
+                changed |= engine.add_gcis(added_gcis)
+        finally:
+            # also after a failed update, the results of the classes changed so far are outdated
+            changed = sorted(graph.args[concept] for concept in changed if engine.is_subsumer(concept))
+            for class_name in changed:
+                self.results.discard((ontology_file, class_name))
+        return changed
+
+    def handle(self, request):
+        if not isinstance(request, dict):
+            return {"error": "a request has to be a JSON object"}
+        try:
+            op = request.get("op", "subsumers")
+            with self.lock:
+                if op == "subsumers":
+                    subsumers, cached = self.subsumers(request["ontology"], request["class"])
+                    return {"subsumers": subsumers, "cached": cached}
+                if op == "is_subsumed":
+                    return {"answers": self.is_subsumed(request["ontology"], request["pairs"])}
+                if op == "load":
+                    self.get_engine(request["ontology"])
+                    return {"loaded": request["ontology"]}
+                if op == "update":
+                    changed = self.update(request["ontology"], request.get("add", []), request.get("remove", []))
+                    return {"changed": changed}
+                if op == "stats":
+                    return {"cache": self.results.stats(), "ontologies": sorted(self.engines)}
+            return {"error": f"unknown op {op}"}
+        except (KeyError, IndexError, TypeError, OSError, ValueError) as error:
+            return {"error": f"{type(error).__name__}: {error}"}
+
+    def handle_line(self, line):
+        try:
+            request = json.loads(line)
+        except json.JSONDecodeError as error:
+            return json.dumps({"error": f"invalid JSON: {error}"})
+        return json.dumps(self.handle(request))
+
+    def serve_stdin(self):
+        for line in sys.stdin:
+            if line.strip():
+                print(self.handle_line(line), flush=True)
+
+    def serve_socket(self, address=DEFAULT_ADDRESS):
+        service = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                for line in self.rfile:
+                    if line.strip():
+                        self.wfile.write((service.handle_line(line.decode("utf-8")) + "\n").encode("utf-8"))
+
+        with socketserver.ThreadingTCPServer(parse_address(address), Handler) as server:
+            server.daemon_threads = True
+            server.serve_forever()
+
+
+def check_concept(expression):
+    # raises ValueError for a malformed concept, before anything is added to a graph
+    if isinstance(expression, str):
+        return
+    if isinstance(expression, list) and expression:
+        if expression[0] == "and" and len(expression) > 2:
+            for conjunct in expression[1:]:
+                check_concept(conjunct)
+            return
+        if expression[0] == "some" and len(expression) == 3 and isinstance(expression[1], str):
+            check_concept(expression[2])
+            return
+    raise ValueError(f"invalid concept {expression}")
+
+
+def concept_from_json(graph, expression, known_only=False):
+    """
+    :param known_only: only look up concepts of the graph, a ValueError is raised for other concepts
+                       instead of adding them
+    """
+    if isinstance(expression, str):
+        if expression == "⊤":
+            return graph.top
+        if expression == "⊥":
+            return graph.bottom
+        concept = graph.find_concept_name(expression) if known_only else graph.concept_name(expression)
+    elif expression[0] == "and":
+        concept = concept_from_json(graph, expression[1], known_only)
+        for conjunct in expression[2:]:
+            conjunct = concept_from_json(graph, conjunct, known_only)
+            concept = graph.find_conjunction(concept, conjunct) if known_only else graph.conjunction(concept, conjunct)
+            if concept is None:
+                break
+    else:
+        filler = concept_from_json(graph, expression[2], known_only)
+        if known_only:
+            role = graph.role_ids.get(expression[1])
+            concept = graph.find_existential(role, filler) if role is not None else None
+        else:
+            concept = graph.existential(graph.role(expression[1]), filler)
+    if concept is None:
+        raise ValueError(f"unknown concept {expression}")
+    return concept
+
+
+def axioms_from_json(graph, axioms, known_only=False):
+    """
+    :param known_only: see concept_from_json
+    :return: the GCIs of the axioms, the graph is only changed once all of them are valid
+    """
+    for axiom in axioms:
+        if not isinstance(axiom, list) or len(axiom) != 3:
+            raise ValueError(f"invalid axiom {axiom}")
+        if axiom[0] not in ("gci", "equivalence"):
+            raise ValueError(f"invalid axiom type {axiom[0]}")
+        check_concept(axiom[1])
+        check_concept(axiom[2])
+    gcis = []
+    equivalences = []
+    for kind, conceptA, conceptB in axioms:
+        pair = (concept_from_json(graph, conceptA, known_only), concept_from_json(graph, conceptB, known_only))
+        (gcis if kind == "gci" else equivalences).append(pair)
+    return axiom_gcis(gcis, equivalences)
+
+
+def parse_address(address):
+    host, _, port = address.rpartition(":")
+    return host or "localhost", int(port)
+
+
+def query_service(address, request):
+    """
+    Send one request to a running reasoner service.
+    :return: the decoded response
+    """
+    with socket.create_connection(parse_address(address)) as connection:
+        connection.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        with connection.makefile("r", encoding="utf-8") as response:
+            return json.loads(response.readline())
+
+
+def main():
+    command_line_parser = argparse.ArgumentParser(description='Run a resident reasoner service.')
+    command_line_parser.add_argument('--address', type=str, default=DEFAULT_ADDRESS,
+                                     help='HOST:PORT to listen on')
+    command_line_parser.add_argument('--stdin', action='store_true',
+                                     help='Read requests from stdin and write responses to stdout instead')
+    command_line_parser.add_argument('--cache-size', type=int, default=10000,
+                                     help='Maximum number of cached (ontology, class) results')
+    command_line_parser.add_argument('--cache-dir', type=str, default=None,
+                                     help='Directory of the compiled-ontology cache (disabled by default)')
+    command_line_parser.add_argument('--loader', choices=['gateway', 'python'], default='gateway',
+                                     help='Parse ontologies with dl4python (default) or in python without a JVM')
+    command_line_parser.add_argument('--preload', type=str, nargs='*', default=[],
+                                     help='Ontology files to load at startup')
+    args = command_line_parser.parse_args()
+
+    service = ReasonerService(cache_size=args.cache_size, cache_dir=args.cache_dir, loader=args.loader)
+    for ontology_file in args.preload:
+        service.get_engine(ontology_file)
+    if args.stdin:
+        service.serve_stdin()
+    else:
+        service.serve_socket(args.address)
+
+
+if __name__ == "__main__":
+    # command example: python reasoner_service.py --loader python --preload TestOntologies/pizza.owl
+    # client example: python el_reasoner.py TestOntologies/pizza.owl '"Margherita"' --service localhost:8765
+    main()
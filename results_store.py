@@ -0,0 +1,194 @@
+import argparse
+import ast
+import csv
+import json
+import os
+import sqlite3
+from ontology_cache import file_hash
+
+"""
+Results of evaluation runs in an sqlite database, so an interrupted run can be resumed.
+
+Every row is keyed by (SHA-256 hash of the ontology file, class, reasoner, engine version). A rerun
+skips the keys that are already stored, and bumping ENGINE_VERSION after a change to the reasoners
+makes them run again without losing the results of the older version. Rows are buffered and
+committed in batches, a crash loses at most the last uncommitted batch.
+The stored results of all versions can be exported in the layout of results.csv that analysis.ipynb
+reads, with an engine_version column. An existing results.csv is imported into a new store first,
+so its rows are kept by the next export; rows without an engine version are imported as "legacy",
+they never count as finished work of the current version.
+"""
+
+# bump when the results or the measurements of the reasoners change
+ENGINE_VERSION = "1"
+# engine version of imported rows written before the version was recorded
+LEGACY_VERSION = "legacy"
+CSV_FIELDS = ['file', 'class', 'reasoner', 'iterations', 'time', 'n_subsumers', 'subsumers', 'engine_version']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    file_hash TEXT NOT NULL,
+    class TEXT NOT NULL,
+    reasoner INTEGER NOT NULL,
+    engine_version TEXT NOT NULL,
+    file TEXT NOT NULL,
+    iterations INTEGER,
+    time REAL,
+    n_subsumers INTEGER NOT NULL,
+    subsumers TEXT NOT NULL,
+    PRIMARY KEY (file_hash, class, reasoner, engine_version)
+);
+CREATE TABLE IF NOT EXISTS finished_files (
+    file_hash TEXT NOT NULL,
+    engine_version TEXT NOT NULL,
+    PRIMARY KEY (file_hash, engine_version)
+)
+"""
+
+
+class ResultsStore:
+    def __init__(self, path, engine_version=ENGINE_VERSION, batch_size=100):
+        """
+        :param path: sqlite database file, created if it does not exist
+        :param engine_version: version written with new rows and used to look up finished work
+        :param batch_size: number of buffered rows that triggers a commit
+        """
+        self.path = path
+        self.engine_version = engine_version
+        self.batch_size = batch_size
+        self.connection = sqlite3.connect(path)
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+        # rows added since the last commit
+        self.pending = []
+
+    def completed(self, file_hash):
+        """
+        :return: set of (class, reasoner) pairs of the file that are stored for the engine version
+        """
+        rows = self.connection.execute(
+            "SELECT class, reasoner FROM results WHERE file_hash = ? AND engine_version = ?",
+            (file_hash, self.engine_version))
+        done = set(rows)
+        done.update((row[1], row[2]) for row in self.pending
+                    if row[0] == file_hash and row[3] == self.engine_version)
+        return done
+
+    def finish_file(self, file_hash):
+        # every result of the file is stored for the engine version
+        self.flush()
+        with self.connection:
+            self.connection.execute("INSERT OR REPLACE INTO finished_files VALUES (?, ?)",
+                                    (file_hash, self.engine_version))
+
+    def file_finished(self, file_hash):
+        """
+        :return: True if finish_file was called for the file with the engine version of the store,
+                 so a rerun can skip it without parsing the ontology
+        """
+        return self.connection.execute("SELECT 1 FROM finished_files WHERE file_hash = ? AND engine_version = ?",
+                                       (file_hash, self.engine_version)).fetchone() is not None
+
+    def add(self, file_hash, data):
+        # data is a row in the layout of results.csv, the engine version of the store unless it has one
+        self.pending.append((file_hash, data['class'], data['reasoner'],
+                             data.get('engine_version') or self.engine_version, data['file'],
+                             data['iterations'], data['time'], data['n_subsumers'], json.dumps(data['subsumers'])))
+        if len(self.pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        with self.connection:
+            self.connection.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                                        self.pending)
+        self.pending = []
+
+    def empty(self):
+        return not self.pending and self.connection.execute("SELECT 1 FROM results LIMIT 1").fetchone() is None
+
+    def import_csv(self, csv_path):
+        """
+        Add the rows of a CSV file in the layout of results.csv with their engine version, LEGACY_VERSION
+        for rows (or files) without one. Rows of ontology files that no longer exist are keyed by their path
+        instead of a hash, they are exported again but never count as finished work.
+        :return: number of imported rows
+        """
+        hashes = {}
+        n_rows = 0
+        with open(csv_path, newline='') as csvfile:
+            for data in csv.DictReader(csvfile):
+                path = data['file']
+                if path not in hashes:
+                    hashes[path] = file_hash(path) if os.path.isfile(path) else "missing:" + path
+                data['reasoner'] = int(data['reasoner'])
+                data['iterations'] = int(data['iterations']) if data['iterations'] else None
+                data['time'] = float(data['time']) if data['time'] else None
+                data['n_subsumers'] = int(data['n_subsumers'])
+                data['subsumers'] = ast.literal_eval(data['subsumers'])
+                data['engine_version'] = data.get('engine_version') or LEGACY_VERSION
+                self.add(hashes[path], data)
+                n_rows += 1
+        self.flush()
+        return n_rows
+
+    def rows(self, engine_version=None):
+        """
+        :param engine_version: only rows of this version, all rows if None
+        :return: generator of rows in the layout of results.csv, in the order they were added
+        """
+        self.flush()
+        query = "SELECT file, class, reasoner, iterations, time, n_subsumers, subsumers, engine_version FROM results"
+        parameters = ()
+        if engine_version is not None:
+            query += " WHERE engine_version = ?"
+            parameters = (engine_version,)
+        for row in self.connection.execute(query + " ORDER BY rowid", parameters):
+            data = dict(zip(CSV_FIELDS, row))
+            data['subsumers'] = json.loads(data['subsumers'])
+            yield data
+
+    def export_csv(self, csv_path, engine_version=None):
+        """
+        Write the rows in the layout of results.csv (subsumers as a python list literal).
+        :param engine_version: only rows of this version, rows of all versions if None
+        :return: number of exported rows
+        """
+        n_rows = 0
+        with open(csv_path, 'w', newline='') as csvfile:
+            # line endings of the tracked results.csv
+            writer = csv.DictWriter(csvfile, fieldnames=CSV_FIELDS, lineterminator='\n')
+            writer.writeheader()
+            for data in self.rows(engine_version):
+                writer.writerow(data)
+                n_rows += 1
+        return n_rows
+
+    def close(self):
+        self.flush()
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def main():
+    command_line_parser = argparse.ArgumentParser(description='Export the stored evaluation results.')
+    command_line_parser.add_argument('store', type=str, help='Path to the sqlite results store')
+    command_line_parser.add_argument('--output', type=str, default='results.csv', help='Output CSV file')
+    command_line_parser.add_argument('--engine-version', type=str, default=None,
+                                     help='Only export the results of this engine version')
+    args = command_line_parser.parse_args()
+
+    with ResultsStore(args.store) as store:
+        n_rows = store.export_csv(args.output, args.engine_version)
+    print(f"{n_rows} rows written to {args.output}")
+
+
+if __name__ == "__main__":
+    # command example: python results_store.py results.sqlite --output results.csv
+    main()
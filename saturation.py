@@ -0,0 +1,353 @@
+from collections import deque
+from bitset import ConceptSet
+from concept_graph import NAME, TOP, CONJUNCTION, EXISTENTIAL
+from element_store import ElementStore
+from told_hierarchy import told_sets
+
+"""
+Worklist (semi-naive) saturation engine:
+- every element keeps a todo queue of newly derived concepts
+- the completion rules only fire on those new facts
+- saturation stops when all queues are empty, the model is never copied or compared
+- GCIs can be added to or removed from a saturated engine, only the affected part is recomputed:
+  additions propagate their new consequences, removals over-delete everything that may depend on
+  the removed GCIs and re-derive what still follows from the rest (DRed)
+- yes/no subsumption checks stop saturating as soon as the answer is known (subsumed_by), the
+  queues keep the remaining work for later queries
+- ⊥ goes back from an element to all of its predecessors (∃r.⊥ ⊑ ⊥), an element with ⊥ has every
+  subsumer, so the rest of its facts are not processed and a query stops as soon as it gets ⊥
+"""
+
+
+class Element:
+    __slots__ = ("id", "initial_concept", "concepts", "todo", "successors", "predecessors")
+
+    def __init__(self, element_id, initial_concept):
+        # position in SaturationEngine.elements
+        self.id = element_id
+        self.initial_concept = initial_concept
+        self.concepts = set()
+        # derived concepts the rules have not been applied to yet
+        self.todo = deque()
+        # role -> set of elements
+        self.successors = {}
+        self.predecessors = {}
+
+
+class SaturationEngine:
+    def __init__(self, graph, input_concepts=None):
+        self.graph = graph
+        self.input_concepts = graph.input_concepts if input_concepts is None else input_concepts
+        self.elements = []
+        # initial concept -> element, there is exactly one element per initial concept
+        self.initial_elements = {}
+        # elements with a non-empty todo queue
+        self.active = deque()
+        # number of processed facts
+        self.total = 0
+        # (element, concept) pairs added while a TBox update is propagated, None otherwise
+        self.log = None
+
+    def element_for(self, concept):
+        element = self.initial_elements.get(concept)
+        if element is None:
+            element = Element(len(self.elements), concept)
+            self.elements.append(element)
+            self.initial_elements[concept] = element
+            self.add(element, concept)
+            # ⊤-rule: Add ⊤ to any individual
+            # only concepts from the input are assigned
+            if self.graph.top in self.input_concepts:
+                self.add(element, self.graph.top)
+        return element
+
+    def add(self, element, concept):
+        if concept in element.concepts:
+            return False
+        element.concepts.add(concept)
+        if self.log is not None:
+            self.log.append((element, concept))
+        if not element.todo:
+            self.active.append(element)
+        element.todo.append(concept)
+        return True
+
+    def link(self, element, role, successor):
+        successors = element.successors.setdefault(role, set())
+        if successor in successors:
+            return
+        successors.add(successor)
+        successor.predecessors.setdefault(role, set()).add(element)
+        # ∃-rule 2 for the new edge: every concept C of the successor gives ∃r.C
+        for concept in list(successor.concepts):
+            self.add_existential(element, role, concept)
+
+    def existential(self, role, filler):
+        # the concept ∃-rule 2 gives a predecessor, ∃r.⊥ is unsatisfiable, so that is ⊥ itself
+        if filler == self.graph.bottom:
+            return filler
+        return self.graph.find_existential(role, filler)
+
+    def add_existential(self, element, role, filler):
+        # only concepts from the input are assigned
+        existential = self.existential(role, filler)
+        if existential is not None and existential in self.input_concepts:
+            self.add(element, existential)
+
+    def apply_completion_rules(self, element, concept):
+        graph = self.graph
+        kind = graph.kinds[concept]
+        # ⊓-rule 1: If d has C ⊓ D assigned, assign also C and D to d
+        if kind == CONJUNCTION:
+            for conjunct in graph.args[concept]:
+                if conjunct in self.input_concepts:
+                    self.add(element, conjunct)
+        # ⊓-rule 2: If d has C and D assigned, assign also C ⊓ D to d
+        # only the partners of C in conjunctions occurring in the ontology are checked
+        for partner, conjunction in graph.conjunctions_with.get(concept, ()):
+            if partner in element.concepts and conjunction in self.input_concepts:
+                self.add(element, conjunction)
+        # ∃-rule 1: If d has ∃r.C assigned, make the element with initial concept C
+        # (a new one if there is none) the r-successor of d
+        if kind == EXISTENTIAL:
+            role, filler = graph.args[concept]
+            if filler in self.initial_elements or filler in self.input_concepts:
+                self.link(element, role, self.element_for(filler))
+        # ∃-rule 2: If d has an r-successor with C assigned, add ∃r.C to d
+        # (⊥-rule: If d has an r-successor with ⊥ assigned, add ⊥ to d)
+        for role, predecessors in element.predecessors.items():
+            for predecessor in list(predecessors):
+                self.add_existential(predecessor, role, concept)
+        # ⊑-rule: If d has C assigned and C ⊑ D ∈ T, then also assign D to d
+        for rhs in graph.told_subsumers.get(concept, ()):
+            self.add(element, rhs)
+
+    def saturate(self, goal=None):
+        """
+        :param goal: (element, set of concepts or None), stop as soon as the element has all of the
+                     concepts or ⊥, the facts not processed yet stay in the queues
+        :return: number of processed facts
+        """
+        bottom = self.graph.bottom
+        while self.active:
+            if goal is not None and (bottom in goal[0].concepts
+                                     or goal[1] is not None and goal[1] <= goal[0].concepts):
+                break
+            element = self.active.popleft()
+            while element.todo:
+                concept = element.todo.popleft()
+                # the element has every subsumer, only ⊥ still has to reach its predecessors
+                # (re-derivation after ⊥ is removed applies the rules to all of its concepts again)
+                if bottom in element.concepts and concept != bottom:
+                    continue
+                self.total += 1
+                self.apply_completion_rules(element, concept)
+        return self.total
+
+    def add_gcis(self, gcis):
+        """
+        Add GCIs to the graph and propagate only their new consequences.
+        :param gcis: (lhs, rhs) pairs of concepts of the graph
+        :return: initial concepts of the elements that got new subsumers
+        """
+        graph = self.graph
+        self.saturate()
+        self.log = []
+        # elements created by the update are new, not changed
+        n_elements = len(self.elements)
+        new_concepts = graph.sub_concepts(concept for gci in gcis for concept in gci) - self.input_concepts
+        for lhs, rhs in gcis:
+            graph.add_gci(lhs, rhs)
+        self.input_concepts.update(new_concepts)
+        # rules that could not assign the new input concepts before
+        for concept in new_concepts:
+            kind = graph.kinds[concept]
+            if kind == TOP:
+                for element in self.elements:
+                    self.add(element, concept)
+            elif kind == CONJUNCTION:
+                first, second = graph.args[concept]
+                for element in self.elements:
+                    if first in element.concepts and second in element.concepts:
+                        self.add(element, concept)
+            elif kind == EXISTENTIAL:
+                role, filler = graph.args[concept]
+                for element in self.elements:
+                    if filler in element.concepts:
+                        # ∃-rule 2, ∃r.⊥ is assigned as ⊥ like in apply_completion_rules
+                        for predecessor in list(element.predecessors.get(role, ())):
+                            self.add_existential(predecessor, role, filler)
+        # ⊓-rule 1 and ∃-rule 1 again on concepts that stayed assigned (as initial concepts) while
+        # their conjuncts or filler were no input concepts, after an earlier removal
+        for element in self.elements:
+            for concept in list(element.concepts):
+                kind = graph.kinds[concept]
+                if kind == CONJUNCTION and not new_concepts.isdisjoint(graph.args[concept]) \
+                        or kind == EXISTENTIAL and graph.args[concept][1] in new_concepts:
+                    if not element.todo:
+                        self.active.append(element)
+                    element.todo.append(concept)
+        # ⊑-rule for the new GCIs on the existing elements
+        for lhs, rhs in gcis:
+            for element in self.elements:
+                if lhs in element.concepts:
+                    self.add(element, rhs)
+        self.saturate()
+        added, self.log = self.log, None
+        return {element.initial_concept for element, concept in added
+                if element.id < n_elements and self.changes_subsumers(element, concept)}
+
+    def remove_gcis(self, gcis):
+        """
+        Remove GCIs from the graph and update the saturation with over-deletion and re-derivation.
+        :param gcis: (lhs, rhs) pairs of concepts of the graph, each one has to be in the TBox
+        :return: initial concepts of the elements that lost subsumers
+        """
+        graph = self.graph
+        self.saturate()
+        removed = []
+        try:
+            for lhs, rhs in gcis:
+                graph.remove_gci(lhs, rhs)
+                removed.append((lhs, rhs))
+        except ValueError:
+            # leave the TBox as it was
+            for lhs, rhs in removed:
+                graph.add_gci(lhs, rhs)
+            raise
+        # concepts that only occurred in the removed GCIs are no longer assigned
+        remaining = graph.sub_concepts(concept for gci in graph.gcis for concept in gci)
+        dropped = {concept for concept in graph.sub_concepts(concept for gci in gcis for concept in gci)
+                   if concept not in remaining and concept in self.input_concepts
+                   and graph.kinds[concept] != NAME and graph.kinds[concept] != TOP}
+        self.input_concepts.difference_update(dropped)
+
+        # facts derived directly from the removed GCIs and from the dropped concepts
+        stack = []
+        for lhs, rhs in gcis:
+            # the same GCI may still be in the TBox
+            if rhs not in graph.told_subsumers.get(lhs, ()):
+                stack.extend((element, rhs) for element in self.elements if lhs in element.concepts)
+        for concept in dropped:
+            stack.extend((element, concept) for element in self.elements if concept in element.concepts)
+        deleted = self.over_delete(stack)
+
+        # re-derivation: the rules are applied again to what is left of the affected elements
+        for element in deleted:
+            if not element.todo:
+                self.active.append(element)
+            element.todo.extend(element.concepts)
+            # ∃-rule 2 over the remaining edges
+            for role, successors in element.successors.items():
+                for successor in list(successors):
+                    for concept in list(successor.concepts):
+                        self.add_existential(element, role, concept)
+        self.saturate()
+        return {element.initial_concept for element, concepts in deleted.items()
+                if any(self.changes_subsumers(element, concept) and concept not in element.concepts
+                       for concept in concepts)}
+
+    def over_delete(self, stack):
+        # deletes the given facts and everything derived from them, whether or not it has
+        # another derivation, and returns element -> deleted concepts
+        graph = self.graph
+        deleted = {}
+        while stack:
+            element, concept = stack.pop()
+            # the initial concept and ⊤ are assigned when the element is created
+            if concept not in element.concepts or concept == element.initial_concept \
+                    or (concept == graph.top and concept in self.input_concepts):
+                continue
+            element.concepts.discard(concept)
+            deleted.setdefault(element, set()).add(concept)
+            kind = graph.kinds[concept]
+            # conclusions of ⊓-rule 1 and 2
+            if kind == CONJUNCTION:
+                stack.extend((element, conjunct) for conjunct in graph.args[concept])
+            stack.extend((element, conjunction) for partner, conjunction in graph.conjunctions_with.get(concept, ()))
+            # conclusions of ∃-rule 2 in the predecessors,
+            # before an edge of the element to itself may be removed below
+            for role, predecessors in element.predecessors.items():
+                existential = self.existential(role, concept)
+                if existential is not None:
+                    stack.extend((predecessor, existential) for predecessor in predecessors)
+            # the edge created by ∃-rule 1 and what ∃-rule 2 derived over it
+            if kind == EXISTENTIAL:
+                role, filler = graph.args[concept]
+                successor = self.initial_elements.get(filler)
+                if successor is not None and successor in element.successors.get(role, ()):
+                    element.successors[role].discard(successor)
+                    successor.predecessors[role].discard(element)
+                    for successor_concept in successor.concepts:
+                        existential = self.existential(role, successor_concept)
+                        if existential is not None:
+                            stack.append((element, existential))
+            # conclusions of the ⊑-rule
+            stack.extend((element, rhs) for rhs in graph.told_subsumers.get(concept, ()))
+        return deleted
+
+    def subsumed_by(self, concept, candidates):
+        """
+        Goal-directed subsumption checks concept ⊑ candidate, without saturating more than needed:
+        the told closure answers yes and the signature of the locality module of the concept answers
+        no without any rule application, the rest is saturated until all of them are found or
+        nothing is left to derive. An unsatisfiable concept is subsumed by all of them.
+        :param candidates: concepts that may subsume the concept
+        :return: set of the candidates that subsume the concept
+        """
+        graph = self.graph
+        bottom = graph.bottom
+        candidates = set(candidates)
+        found = candidates & {concept}
+        told = told_sets(graph, closure=True).get(concept)
+        if told is not None:
+            if bottom in told:
+                return candidates
+            found.update(candidate for candidate in candidates if candidate in told)
+        element = self.initial_elements.get(concept)
+        if element is not None:
+            if bottom in element.concepts:
+                return candidates
+            found.update(candidates & element.concepts)
+        candidates -= found
+        if candidates:
+            # a subsumer of a satisfiable concept occurs in its module,
+            # so the signature only answers no if the module cannot derive ⊥
+            signature = set()
+            module = graph.locality_module([concept], signature)
+            if bottom not in graph.sub_concepts(rhs for lhs, rhs in module):
+                candidates &= signature
+        if candidates:
+            element = self.element_for(concept)
+            self.saturate(goal=(element, candidates))
+            if bottom in element.concepts:
+                return found | candidates
+            found.update(candidates & element.concepts)
+        return found
+
+    def is_subsumer(self, concept):
+        return self.graph.kinds[concept] == NAME and concept not in self.graph.fresh_concepts
+
+    def changes_subsumers(self, element, concept):
+        # whether the subsumers of the element depend on the concept, ⊥ gives it all of them
+        if concept == self.graph.bottom:
+            return True
+        return self.is_subsumer(concept) and self.graph.bottom not in element.concepts
+
+    def subsumers(self, concept):
+        element = self.initial_elements[concept]
+        if self.graph.bottom in element.concepts:
+            return self.graph.all_class_names()
+        return {self.graph.args[c] for c in element.concepts if self.is_subsumer(c)}
+
+    def as_store(self):
+        # elements in the format used by ELReasoner.print_elements
+        store = ElementStore()
+        for element in self.elements:
+            store.add_element(element.initial_concept)
+            store[element.id].concepts = ConceptSet(element.concepts)
+        for element in self.elements:
+            for role, successors in element.successors.items():
+                for successor in successors:
+                    store.add_successor(element.id, role, successor.id)
+        return store
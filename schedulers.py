@@ -0,0 +1,188 @@
+import heapq
+from collections import deque
+from instrumentation import count_facts
+
+"""
+Queue strategies of ELReasoner2.start_2, which element the completion rules are applied to next.
+
+    lifo      the original policy: new and changed elements are pushed on top, unchanged ones are
+              moved to the bottom; stops after a sweep over all elements without any change
+    fifo      round robin: every processed element goes to the back; stops like lifo
+    priority  the element with the most new facts since it was last processed (its own new facts and
+              those of its successors, which ∃-rule 2 reads) first; stops when nothing is pending
+    dirty     only elements that changed, or whose successors changed, since they were last processed
+              are queued, in FIFO order; stops when none is left, without a final sweep
+
+Applying the rules to d only changes d (and creates new elements), so d and its predecessors are
+the only elements that can fire new rules after a step on d.
+"""
+
+
+class Scheduler:
+    name = None
+    # True if the reasoner stops after a sweep over all elements without a change
+    sweeps = False
+
+    def __init__(self):
+        self.dequeues = 0
+        self.requeues = 0
+        self.max_length = 0
+
+    def add(self, d):
+        # d is a new element
+        raise NotImplementedError
+
+    def processed(self, d, before, elements):
+        """
+        Schedule again after a step on d.
+        :param before: element d before the step
+        :param elements: the store after the step
+        """
+        raise NotImplementedError
+
+    def pop(self):
+        raise NotImplementedError
+
+    def __len__(self):
+        raise NotImplementedError
+
+    def finished(self, without_change, n_elements):
+        """
+        :param without_change: number of steps in a row that did not change the model
+        """
+        if self.sweeps:
+            return without_change == n_elements
+        return len(self) == 0
+
+    def count_pop(self):
+        self.dequeues += 1
+        self.max_length = max(self.max_length, len(self) + 1)
+
+    def stats(self):
+        return {"strategy": self.name, "dequeues": self.dequeues, "requeues": self.requeues,
+                "max_queue": self.max_length}
+
+
+class LIFOScheduler(Scheduler):
+    name = "lifo"
+    sweeps = True
+
+    def __init__(self):
+        super().__init__()
+        self.queue = deque()
+
+    def add(self, d):
+        self.queue.append(d)
+
+    def processed(self, d, before, elements):
+        self.requeues += 1
+        if before.concepts == elements[d].concepts:
+            self.queue.appendleft(d)
+        else:
+            self.queue.append(d)
+
+    def pop(self):
+        d = self.queue.pop()
+        self.count_pop()
+        return d
+
+    def __len__(self):
+        return len(self.queue)
+
+
+class FIFOScheduler(LIFOScheduler):
+    name = "fifo"
+
+    def processed(self, d, before, elements):
+        self.requeues += 1
+        self.queue.append(d)
+
+    def pop(self):
+        d = self.queue.popleft()
+        self.count_pop()
+        return d
+
+
+class DirtyScheduler(Scheduler):
+    name = "dirty"
+
+    def __init__(self):
+        super().__init__()
+        self.queue = deque()
+        self.dirty = set()
+
+    def mark(self, d):
+        if d not in self.dirty:
+            self.dirty.add(d)
+            self.queue.append(d)
+            return True
+        return False
+
+    def add(self, d):
+        self.mark(d)
+
+    def processed(self, d, before, elements):
+        if before == elements[d]:
+            return
+        self.requeues += self.mark(d)
+        for predecessors in elements[d].predecessors.values():
+            for predecessor in predecessors:
+                self.requeues += self.mark(predecessor)
+
+    def pop(self):
+        d = self.queue.popleft()
+        self.dirty.discard(d)
+        self.count_pop()
+        return d
+
+    def __len__(self):
+        return len(self.queue)
+
+
+class PriorityScheduler(Scheduler):
+    name = "priority"
+
+    def __init__(self):
+        super().__init__()
+        # element -> number of new facts it has not been processed with
+        self.pending = {}
+        # (-pending, insertion number, element), entries with an outdated count are skipped
+        self.heap = []
+        self.pushes = 0
+
+    def push(self, d, delta):
+        self.pending[d] = self.pending.get(d, 0) + delta
+        self.pushes += 1
+        heapq.heappush(self.heap, (-self.pending[d], self.pushes, d))
+
+    def add(self, d):
+        self.push(d, 1)
+
+    def processed(self, d, before, elements):
+        delta = count_facts(elements[d]) - count_facts(before)
+        if delta == 0:
+            return
+        self.requeues += 1
+        self.push(d, delta)
+        for predecessors in elements[d].predecessors.values():
+            for predecessor in predecessors:
+                self.push(predecessor, delta)
+
+    def pop(self):
+        while True:
+            priority, _, d = heapq.heappop(self.heap)
+            if self.pending.get(d) == -priority:
+                del self.pending[d]
+                self.count_pop()
+                return d
+
+    def __len__(self):
+        return len(self.pending)
+
+
+STRATEGIES = {scheduler.name: scheduler
+              for scheduler in [LIFOScheduler, FIFOScheduler, PriorityScheduler, DirtyScheduler]}
+
+
+def get_scheduler(strategy):
+    return STRATEGIES[strategy]()
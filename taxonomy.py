@@ -0,0 +1,146 @@
+import argparse
+from el_reasoner import Ontology
+from el_reasoner_third import ELReasoner3
+
+"""
+Taxonomy of the classes of an ontology, built from the subsumer sets of a classification
+(ELReasoner3.classify or ELK's classify() through elk.ELKClassification):
+- classes with the same subsumers are equivalent and share one node
+- the strict ancestors of every node are an int bitset over the node ids, the direct parents are
+  the ancestors that are not already an ancestor of another ancestor (transitive reduction),
+  one OR per ancestor instead of comparing the subsumer sets of all pairs of classes
+- direct superclasses and subclasses, ancestors and descendants are kept as lists of node ids,
+  subsumption tests look up one bit
+"""
+
+
+class Taxonomy:
+    def __init__(self, classification):
+        """
+        :param classification: dictionary class name -> subsumer names (with the class itself),
+                               a subsumer that is not a key only has itself as subsumer
+        """
+        names = set(classification)
+        for subsumers in classification.values():
+            names.update(subsumers)
+        subsumer_sets = {name: frozenset(classification.get(name, ())) | {name} for name in sorted(names)}
+
+        # equivalent classes have the same subsumers, so they are grouped by them
+        node_ids = {}
+        # node id -> sorted names of the equivalent classes
+        self.nodes = []
+        # class name -> node id
+        self.node_of = {}
+        for name, subsumers in subsumer_sets.items():
+            node = node_ids.get(subsumers)
+            if node is None:
+                node = len(self.nodes)
+                node_ids[subsumers] = node
+                self.nodes.append([])
+            self.nodes[node].append(name)
+            self.node_of[name] = node
+
+        # node id -> strict ancestors (node ids) as a list to iterate and as bits for the reduction,
+        # iterating the bits of a wide int would take time in the number of nodes
+        self.ancestors_of = []
+        self.ancestor_bits = []
+        self.descendants_of = [[] for _ in self.nodes]
+        for node, members in enumerate(self.nodes):
+            ancestors = sorted({self.node_of[subsumer] for subsumer in subsumer_sets[members[0]]} - {node})
+            bits = 0
+            for ancestor in ancestors:
+                bits |= 1 << ancestor
+                self.descendants_of[ancestor].append(node)
+            self.ancestors_of.append(ancestors)
+            self.ancestor_bits.append(bits)
+
+        # transitive reduction: a direct parent is no ancestor of another ancestor
+        self.parents_of = []
+        self.children_of = [[] for _ in self.nodes]
+        for node, ancestors in enumerate(self.ancestors_of):
+            indirect = 0
+            for ancestor in ancestors:
+                indirect |= self.ancestor_bits[ancestor]
+            parents = [ancestor for ancestor in ancestors if not indirect >> ancestor & 1]
+            self.parents_of.append(parents)
+            for parent in parents:
+                self.children_of[parent].append(node)
+
+    @classmethod
+    def from_elk(cls, elk_classification):
+        """
+        :param elk_classification: elk.ELKClassification, its subsumers get the class itself and lose ⊤
+        """
+        return cls({class_name: elk_classification.get_subsumers(class_name)
+                    for class_name in elk_classification.subsumers if class_name not in ('⊤', '⊥')})
+
+    def node_names(self, nodes):
+        # names of the classes of the nodes
+        return {name for node in nodes for name in self.nodes[node]}
+
+    def equivalents(self, class_name):
+        """
+        :return: set of the classes equivalent to the class, itself included
+        """
+        return set(self.nodes[self.node_of[class_name]])
+
+    def direct_superclasses(self, class_name):
+        return self.node_names(self.parents_of[self.node_of[class_name]])
+
+    def direct_subclasses(self, class_name):
+        return self.node_names(self.children_of[self.node_of[class_name]])
+
+    def ancestors(self, class_name):
+        """
+        :return: set of the strict superclasses of the class, without its equivalents
+        """
+        return self.node_names(self.ancestors_of[self.node_of[class_name]])
+
+    def descendants(self, class_name):
+        """
+        :return: set of the strict subclasses of the class, without its equivalents
+        """
+        return self.node_names(self.descendants_of[self.node_of[class_name]])
+
+    def is_subsumed(self, sub_class, super_class):
+        sub_node = self.node_of[sub_class]
+        super_node = self.node_of[super_class]
+        return sub_node == super_node or self.ancestor_bits[sub_node] >> super_node & 1 == 1
+
+    def roots(self):
+        # nodes without a parent, the direct subclasses of ⊤
+        return [members for node, members in enumerate(self.nodes) if not self.parents_of[node]]
+
+    def subsumers(self, class_name):
+        """
+        :return: all subsumers of the class in the format of the classification, to check the taxonomy
+        """
+        return self.equivalents(class_name) | self.ancestors(class_name)
+
+
+def main():
+    command_line_parser = argparse.ArgumentParser(description='Print the direct superclasses of every class.')
+    command_line_parser.add_argument('ontology_file', type=str, help='Path to the ontology file')
+    command_line_parser.add_argument('--reasoner', choices=['el', 'elk'], default='el',
+                                     help='Classify with ELReasoner3 (default) or with ELK through the gateway')
+    command_line_parser.add_argument('--cache-dir', type=str, default=None,
+                                     help='Directory of the compiled-ontology cache (disabled by default)')
+    command_line_parser.add_argument('--loader', choices=['gateway', 'python'], default='gateway',
+                                     help='Parse the ontology with dl4python (default) or in python without a JVM')
+    args = command_line_parser.parse_args()
+
+    ontology = Ontology(ontology_file=args.ontology_file, cache_dir=args.cache_dir, loader=args.loader)
+    if args.reasoner == 'elk':
+        # elk connects to the java gateway when it is imported
+        from elk import ELKClassification
+        taxonomy = Taxonomy.from_elk(ELKClassification(ontology.ontology, ontology.gateway))
+    else:
+        taxonomy = Taxonomy(ELReasoner3(ontology).classify()[0])
+    # 1 node per line: equivalent classes, followed by the direct superclasses
+    for members in taxonomy.nodes:
+        print(f"{' ≡ '.join(members)}: {', '.join(sorted(taxonomy.direct_superclasses(members[0])))}")
+
+
+if __name__ == "__main__":
+    # command example: python taxonomy.py TestOntologies/pizza.owl --loader python
+    main()
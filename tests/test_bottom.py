@@ -0,0 +1,48 @@
+import unittest
+from concept_graph import ConceptGraph
+from saturation import SaturationEngine
+
+
+def saturated_engine(graph, names):
+    graph.input_concepts = graph.sub_concepts(concept for gci in graph.gcis for concept in gci)
+    graph.input_concepts.add(graph.top)
+    engine = SaturationEngine(graph)
+    for name in names:
+        engine.element_for(graph.concept_name(name))
+    engine.saturate()
+    return engine
+
+
+class BottomTest(unittest.TestCase):
+    def setUp(self):
+        # A ⊑ ∃r.B, B ⊑ ⊥
+        self.graph = ConceptGraph()
+        self.a, self.b, self.c = (self.graph.concept_name(name) for name in "ABC")
+        self.r = self.graph.role("r")
+        self.graph.add_gci(self.a, self.graph.existential(self.r, self.b))
+        self.graph.add_gci(self.b, self.graph.bottom)
+
+    def test_bottom_goes_back_to_predecessors(self):
+        engine = saturated_engine(self.graph, "ABC")
+        self.assertEqual(engine.subsumers(self.a), {"A", "B", "C"})
+        self.assertEqual(engine.subsumers(self.c), {"C"})
+
+    def test_add_then_remove_with_bottom(self):
+        engine = saturated_engine(self.graph, "ABC")
+        engine.add_gcis([(self.graph.existential(self.r, self.graph.bottom), self.c)])
+        changed = engine.remove_gcis([(self.b, self.graph.bottom)])
+        self.assertEqual(engine.subsumers(self.a), {"A"})
+        self.assertEqual(engine.subsumers(self.b), {"B"})
+        self.assertIn(self.a, changed)
+
+    def test_query_stops_at_bottom(self):
+        engine = SaturationEngine(self.graph)
+        self.graph.input_concepts = self.graph.sub_concepts(c for gci in self.graph.gcis for c in gci)
+        element = engine.element_for(self.b)
+        engine.saturate(goal=(element, None))
+        self.assertIn(self.graph.bottom, element.concepts)
+        self.assertEqual(engine.subsumers(self.b), {"A", "B", "C"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,41 @@
+import os
+import unittest
+from concurrent_saturation import concurrent_subsumers
+from el_reasoner import Ontology
+from el_reasoner_third import ELReasoner3
+
+PIZZA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "TestOntologies", "pizza.owl")
+
+
+class ConcurrentSaturationTest(unittest.TestCase):
+    def setUp(self):
+        self.ontology = Ontology(PIZZA, loader="python")
+
+    def test_same_subsumers_as_one_process(self):
+        classification = ELReasoner3(self.ontology).classify()[0]
+        class_names = ['"Margherita"', '"Napoletana"', '"IceCream"', '"VegetarianPizza2"']
+        subsumers, _ = concurrent_subsumers(self.ontology.get_normalized_graph(), class_names, workers=2)
+        self.assertEqual(subsumers, {class_name: classification[class_name] for class_name in class_names})
+
+    def test_unknown_names_are_not_added(self):
+        graph = self.ontology.get_normalized_graph()
+        n_concepts = len(graph)
+        subsumers, _ = concurrent_subsumers(graph, ['"Margherita"', "Typo"], workers=2)
+        self.assertEqual(subsumers["Typo"], {"Typo"})
+        self.assertIn('"Pizza"', subsumers['"Margherita"'])
+        self.assertEqual(len(graph), n_concepts)
+
+    def test_worker_exception_is_raised(self):
+        graph = self.ontology.get_normalized_graph()
+        told_subsumers = graph.told_subsumers
+        # the workers fail as soon as they apply the ⊑-rule
+        graph.told_subsumers = None
+        try:
+            with self.assertRaisesRegex(RuntimeError, "AttributeError"):
+                concurrent_subsumers(graph, ['"Margherita"'], workers=2)
+        finally:
+            graph.told_subsumers = told_subsumers
+
+
+if __name__ == "__main__":
+    unittest.main()
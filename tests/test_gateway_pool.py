@@ -0,0 +1,73 @@
+import unittest
+from gateway_pool import GatewayPool
+
+
+class FakeConnection:
+    # stands in for a GatewayConnection, the pool logic does not need a JVM
+    def __init__(self, port):
+        self.port = port
+        self.last_used = 0.0
+        self.closed = False
+
+    def alive(self):
+        return not self.closed
+
+    def close(self):
+        self.closed = True
+
+
+class FlakyPool(GatewayPool):
+    def __init__(self, ports, failing_ports=()):
+        self.fail = False
+        self.failing_ports = failing_ports
+        super().__init__(ports)
+
+    def open(self, port):
+        if self.fail or port in self.failing_ports:
+            raise RuntimeError(f"could not start a gateway on port {port}")
+        return FakeConnection(port)
+
+
+class RecycleTest(unittest.TestCase):
+    def test_failed_restart_keeps_the_port(self):
+        pool = FlakyPool([25333])
+        with pool.connection() as connection:
+            connection.close()
+        pool.fail = True
+        with self.assertRaisesRegex(RuntimeError, "could not restart the gateway on port 25333"):
+            pool.acquire()
+        # the placeholder is still in the pool, so the next acquire does not block
+        with self.assertRaisesRegex(RuntimeError, "could not restart"):
+            pool.acquire()
+        pool.fail = False
+        connection = pool.acquire()
+        self.assertFalse(connection.closed)
+        self.assertEqual(pool.connections, [connection])
+
+    def test_check_idle_keeps_the_port(self):
+        pool = FlakyPool([25333])
+        pool.connections[0].close()
+        pool.fail = True
+        pool.check_idle()
+        self.assertEqual(pool.idle.qsize(), 1)
+
+
+class StartTest(unittest.TestCase):
+    def test_failed_port_closes_the_opened_ones(self):
+        # the pool object is lost when its constructor raises
+        opened = []
+
+        class RecordingPool(FlakyPool):
+            def open(self, port):
+                connection = super().open(port)
+                opened.append(connection)
+                return connection
+
+        with self.assertRaisesRegex(RuntimeError, "port 25335"):
+            RecordingPool([25333, 25334, 25335], failing_ports=[25335])
+        self.assertEqual([connection.port for connection in opened], [25333, 25334])
+        self.assertTrue(all(connection.closed for connection in opened))
+
+
+if __name__ == "__main__":
+    unittest.main()
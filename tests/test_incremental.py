@@ -0,0 +1,81 @@
+import random
+import unittest
+from concept_graph import ConceptGraph
+from saturation import SaturationEngine
+
+N_SEEDS = 1000
+
+
+def random_tbox(seed, n_names=6, n_roles=2, n_axioms=10):
+    """
+    :return: concept graph without GCIs, its concept names and random GCIs over them, with ⊤ and ⊥
+    """
+    rnd = random.Random(seed)
+    graph = ConceptGraph()
+    names = [graph.concept_name(f"N{i}") for i in range(n_names)]
+    roles = [graph.role(f"r{i}") for i in range(n_roles)]
+
+    def concept(depth):
+        choice = rnd.random()
+        if depth == 0 or choice < 0.5:
+            atom = rnd.random()
+            if atom < 0.05:
+                return graph.top
+            if atom < 0.1:
+                return graph.bottom
+            return rnd.choice(names)
+        if choice < 0.75:
+            first, second = concept(depth - 1), concept(depth - 1)
+            return first if first == second else graph.conjunction(first, second)
+        return graph.existential(rnd.choice(roles), concept(depth - 1))
+
+    gcis = [(concept(2), concept(2)) for _ in range(n_axioms)]
+    gcis += [(concept(1), graph.bottom) for _ in range(rnd.randint(0, 2))]
+    return graph, names, gcis
+
+
+def from_scratch(graph, names):
+    # subsumers of every name after saturating the current TBox with a new engine
+    input_concepts = graph.sub_concepts(concept for gci in graph.gcis for concept in gci)
+    input_concepts.add(graph.top)
+    engine = SaturationEngine(graph, input_concepts)
+    for name in names:
+        engine.element_for(name)
+    engine.saturate()
+    return {name: engine.subsumers(name) for name in names}
+
+
+class IncrementalTest(unittest.TestCase):
+    def check(self, seed, engine, names, before, changed):
+        expected = from_scratch(engine.graph, names)
+        found = {name: engine.subsumers(name) for name in names}
+        self.assertEqual(found, expected, f"seed {seed}")
+        # every class whose subsumers changed is reported (a class that gets ⊥ is reported even
+        # if it already had every subsumer)
+        self.assertLessEqual({name for name in names if before[name] != expected[name]}, changed, f"seed {seed}")
+        return found
+
+    def test_random_updates_match_saturation_from_scratch(self):
+        for seed in range(N_SEEDS):
+            graph, names, gcis = random_tbox(seed)
+            rnd = random.Random(seed)
+            split = rnd.randint(0, len(gcis))
+            for lhs, rhs in gcis[:split]:
+                graph.add_gci(lhs, rhs)
+            graph.input_concepts = graph.sub_concepts(concept for gci in graph.gcis for concept in gci)
+            graph.input_concepts.add(graph.top)
+            engine = SaturationEngine(graph)
+            for name in names:
+                engine.element_for(name)
+            engine.saturate()
+            subsumers = {name: engine.subsumers(name) for name in names}
+
+            subsumers = self.check(seed, engine, names, subsumers, engine.add_gcis(gcis[split:]))
+            removed = rnd.sample(gcis, rnd.randint(1, len(gcis)))
+            subsumers = self.check(seed, engine, names, subsumers, engine.remove_gcis(removed))
+            # and back again
+            self.check(seed, engine, names, subsumers, engine.add_gcis(removed))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,33 @@
+import os
+import unittest
+from el_reasoner import Ontology, ELReasoner
+from el_reasoner_second import ELReasoner2
+from el_reasoner_third import ELReasoner3
+from saturation import SaturationEngine
+
+TEST_ONTOLOGIES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "TestOntologies")
+# classes per ontology, evenly spread over the sorted class names
+N_CLASSES = 8
+
+
+class ModuleTest(unittest.TestCase):
+    def test_module_agrees_with_saturation_of_the_tbox(self):
+        for file_name in sorted(os.listdir(TEST_ONTOLOGIES)):
+            ontology = Ontology(os.path.join(TEST_ONTOLOGIES, file_name), loader="python")
+            graph = ontology.get_concept_graph()
+            names = sorted(graph.args[concept] for concept in graph.concept_names())
+            names = names[::max(1, len(names) // N_CLASSES)]
+            engine = SaturationEngine(graph)
+            for class_name in names:
+                concept = graph.find_concept_name(class_name)
+                engine.element_for(concept)
+                engine.saturate()
+                expected = engine.subsumers(concept)
+                with self.subTest(ontology=file_name, class_name=class_name):
+                    self.assertEqual(ELReasoner(ontology, class_name, module=True).start()[0], expected)
+                    self.assertEqual(ELReasoner2(ontology, class_name, module=True).start_2()[0], expected)
+                    self.assertEqual(ELReasoner3(ontology, class_name, module=True).start_3()[0], expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
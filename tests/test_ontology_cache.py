@@ -0,0 +1,23 @@
+import os
+import tempfile
+import unittest
+from el_reasoner import Ontology
+
+PIZZA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "TestOntologies", "pizza.owl")
+
+
+class CacheTest(unittest.TestCase):
+    def test_cache_hit_keeps_graphs_and_skipped_constructs(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            parsed = Ontology(PIZZA, cache_dir=cache_dir, loader="python")
+            graph = parsed.get_concept_graph()
+            self.assertTrue(parsed.skipped_constructs)
+            cached = Ontology(PIZZA, cache_dir=cache_dir, loader="python")
+            self.assertIsNotNone(cached.concept_graph)
+            self.assertEqual(cached.skipped_constructs, dict(parsed.skipped_constructs))
+            self.assertEqual(cached.get_concept_graph().gcis, graph.gcis)
+            self.assertEqual(cached.get_concept_graph().fresh_concepts, graph.fresh_concepts)
+
+
+if __name__ == "__main__":
+    unittest.main()
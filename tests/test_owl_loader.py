@@ -0,0 +1,27 @@
+import os
+import unittest
+from el_reasoner import Ontology
+from el_reasoner_third import ELReasoner3
+
+PIZZA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "TestOntologies", "pizza.owl")
+
+
+class ValueRestrictionTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.classification = ELReasoner3(Ontology(PIZZA, loader="python")).classify()[0]
+
+    def test_has_value_and_only_restrictions(self):
+        # Napoletana ⊑ ∃hasCountryOfOrigin.{Italy}, RealItalianPizza ⊑ ∀hasBase.ThinAndCrispyBase
+        subsumers = self.classification['"Napoletana"']
+        self.assertIn('"RealItalianPizza"', subsumers)
+        self.assertIn('"ThinAndCrispyPizza"', subsumers)
+
+    def test_atoms_are_not_classified(self):
+        self.assertEqual(len(self.classification), 99)
+        for name, subsumers in self.classification.items():
+            self.assertFalse(any(subsumer.startswith(("{", "∀")) for subsumer in subsumers | {name}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,21 @@
+import os
+import unittest
+import parallel
+from el_reasoner import Ontology
+
+PIZZA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "TestOntologies", "pizza.owl")
+
+
+class QueryChunkTest(unittest.TestCase):
+    def test_unknown_names_are_not_added(self):
+        graph = Ontology(PIZZA, loader="python").get_normalized_graph()
+        n_concepts = len(graph)
+        parallel.init_worker(graph)
+        results = dict(parallel.query_chunk(["Typo", '"Margherita"']))
+        self.assertEqual(results["Typo"], {"Typo"})
+        self.assertIn('"Pizza"', results['"Margherita"'])
+        self.assertEqual(len(graph), n_concepts)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import json
+import os
+import unittest
+from el_reasoner import ELReasoner, Ontology
+from el_reasoner_third import ELReasoner3
+from reasoner_service import ReasonerService
+
+PIZZA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "TestOntologies", "pizza.owl")
+
+
+class UpdateTest(unittest.TestCase):
+    def setUp(self):
+        self.service = ReasonerService(loader="python")
+
+    def subsumers(self, class_name):
+        return self.service.handle({"op": "subsumers", "ontology": PIZZA, "class": class_name})
+
+    def test_malformed_update_changes_nothing(self):
+        before = self.subsumers('"Margherita"')["subsumers"]
+        self.assertIn("NamedPizza", before)
+        response = self.service.handle({"op": "update", "ontology": PIZZA,
+                                        "remove": [["gci", '"Margherita"', "NamedPizza"]],
+                                        "add": [["gci", '"Margherita"']]})
+        self.assertIn("error", response)
+        answer = self.service.handle({"op": "is_subsumed", "ontology": PIZZA,
+                                      "pairs": [['"Margherita"', "NamedPizza"]]})
+        self.assertEqual(answer["answers"], [True])
+        self.assertEqual(self.subsumers('"Margherita"')["subsumers"], before)
+
+    def test_update_drops_changed_results(self):
+        self.assertIn("NamedPizza", self.subsumers('"Margherita"')["subsumers"])
+        response = self.service.handle({"op": "update", "ontology": PIZZA,
+                                        "remove": [["gci", '"Margherita"', "NamedPizza"]]})
+        self.assertIn('"Margherita"', response["changed"])
+        result = self.subsumers('"Margherita"')
+        self.assertFalse(result["cached"])
+        self.assertNotIn("NamedPizza", result["subsumers"])
+
+
+class RequestTest(unittest.TestCase):
+    def test_request_that_is_no_object(self):
+        service = ReasonerService(loader="python")
+        for line in ['["x"]', '1', '"subsumers"', 'null']:
+            self.assertIn("error", json.loads(service.handle_line(line)))
+
+    def test_relative_and_absolute_paths_share_the_engine(self):
+        service = ReasonerService(loader="python")
+        relative = os.path.relpath(PIZZA)
+        service.get_engine(relative)
+        self.assertFalse(service.handle({"op": "subsumers", "ontology": relative, "class": '"Margherita"'})["cached"])
+        self.assertTrue(service.handle({"op": "subsumers", "ontology": PIZZA, "class": '"Margherita"'})["cached"])
+        self.assertEqual(service.handle({"op": "stats"})["ontologies"], [PIZZA])
+
+class UnknownNameTest(unittest.TestCase):
+    def test_queries_do_not_add_names(self):
+        reasoner = ELReasoner3(Ontology(PIZZA, loader="python"))
+        n_classes = len(reasoner.classify()[0])
+        self.assertEqual(reasoner.is_subsumed_batch([("Typo2", '"Pizza"'), ('"Pizza"', "Typo3"),
+                                                    ("Typo2", "Typo2")]), [False, False, True])
+        reasoner.class_name = "Typo4"
+        self.assertEqual(reasoner.start_3(), ({"Typo4"}, 0))
+        self.assertEqual(len(reasoner.classify()[0]), n_classes)
+
+    def test_el_reasoner_does_not_add_names(self):
+        ontology = Ontology(PIZZA, loader="python")
+        n_concepts = len(ontology.get_concept_graph())
+        reasoner = ELReasoner(ontology=ontology, class_name="Typo", module=False)
+        self.assertEqual(reasoner.start(), ({"Typo"}, 0))
+        self.assertEqual(len(ontology.get_concept_graph()), n_concepts)
+
+    def test_service_does_not_add_names(self):
+        service = ReasonerService(loader="python")
+        self.assertEqual(service.handle({"op": "subsumers", "ontology": PIZZA, "class": "Typo"})["subsumers"],
+                         ["Typo"])
+        response = service.handle({"op": "update", "ontology": PIZZA, "remove": [["gci", "Typo", '"Pizza"']]})
+        self.assertIn("error", response)
+        graph = service.get_engine(PIZZA).graph
+        self.assertIsNone(graph.find_concept_name("Typo"))
+
+
+if __name__ == "__main__":
+    unittest.main()
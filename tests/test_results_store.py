@@ -0,0 +1,60 @@
+import csv
+import os
+import tempfile
+import unittest
+from ontology_cache import file_hash
+from results_store import LEGACY_VERSION, ResultsStore
+
+RESULTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "results.csv")
+
+
+class ImportTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_legacy_rows_are_kept_but_not_finished(self):
+        with ResultsStore(self.path("results.sqlite"), engine_version="2") as store:
+            self.assertTrue(store.empty())
+            n_rows = store.import_csv(RESULTS)
+            self.assertFalse(store.empty())
+            rows = list(store.rows())
+            self.assertEqual(len(rows), n_rows)
+            self.assertEqual({row["engine_version"] for row in rows}, {LEGACY_VERSION})
+            # the rows of existing files are keyed by their hash, evaluation.py would still run them
+            ontology_hash = file_hash(rows[0]["file"])
+            self.assertEqual(store.completed(ontology_hash), set())
+            self.assertFalse(store.file_finished(ontology_hash))
+            with ResultsStore(self.path("results.sqlite"), engine_version=LEGACY_VERSION) as legacy_store:
+                self.assertIn((rows[0]["class"], rows[0]["reasoner"]), legacy_store.completed(ontology_hash))
+
+    def test_export_keeps_every_version(self):
+        with ResultsStore(self.path("results.sqlite"), engine_version="2") as store:
+            store.import_csv(RESULTS)
+            data = {"file": "a.owl", "class": "A", "reasoner": 1, "iterations": 1, "time": 0.1,
+                    "n_subsumers": 1, "subsumers": ["A"]}
+            store.add("hash", data)
+            self.assertEqual(store.completed("hash"), {("A", 1)})
+            store.finish_file("hash")
+            self.assertTrue(store.file_finished("hash"))
+            exported = self.path("results.csv")
+            n_rows = store.export_csv(exported)
+        with open(RESULTS, newline="") as original, open(exported, newline="") as csvfile:
+            legacy = list(csv.DictReader(original))
+            rows = list(csv.DictReader(csvfile))
+        self.assertEqual(n_rows, len(legacy) + 1)
+        self.assertEqual([dict(row, engine_version=LEGACY_VERSION) for row in legacy], rows[:-1])
+        self.assertEqual(rows[-1]["engine_version"], "2")
+        # the versions are read back from the exported file
+        with ResultsStore(self.path("copy.sqlite")) as store:
+            store.import_csv(exported)
+            store.export_csv(self.path("copy.csv"))
+        with open(exported, "rb") as first, open(self.path("copy.csv"), "rb") as second:
+            self.assertEqual(first.read(), second.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import os
+import unittest
+from el_reasoner import Ontology
+from el_reasoner_second import ELReasoner2
+from saturation import SaturationEngine
+from schedulers import STRATEGIES
+
+TEST_ONTOLOGIES = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "TestOntologies")
+# classes per ontology, evenly spread over the sorted class names
+N_CLASSES = 12
+# classes whose result depended on the processing order
+EXTRA_CLASSES = {"ico.informed-consent-ontology.9.owl.xml": ["ICO_0000050", "ICO_0000052"]}
+
+
+class StrategyTest(unittest.TestCase):
+    def test_strategies_agree_with_saturation(self):
+        for file_name in sorted(os.listdir(TEST_ONTOLOGIES)):
+            ontology = Ontology(os.path.join(TEST_ONTOLOGIES, file_name), loader="python")
+            graph = ontology.get_concept_graph()
+            names = sorted(graph.args[concept] for concept in graph.concept_names())
+            names = names[::max(1, len(names) // N_CLASSES)] + EXTRA_CLASSES.get(file_name, [])
+            engine = SaturationEngine(graph)
+            for class_name in names:
+                concept = graph.find_concept_name(class_name)
+                engine.element_for(concept)
+                engine.saturate()
+                expected = engine.subsumers(concept)
+                for strategy in sorted(STRATEGIES):
+                    with self.subTest(ontology=file_name, class_name=class_name, strategy=strategy):
+                        reasoner = ELReasoner2(ontology=ontology, class_name=class_name, strategy=strategy)
+                        self.assertEqual(reasoner.start_2()[0], expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,43 @@
+import os
+import unittest
+from el_reasoner import Ontology
+from el_reasoner_third import ELReasoner3
+from taxonomy import Taxonomy
+
+PIZZA = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "TestOntologies", "pizza.owl")
+
+
+class TaxonomyTest(unittest.TestCase):
+    def test_hand_built_classification(self):
+        # A ≡ B, C ⊑ A, D ⊑ C, E ⊑ D and E ⊑ F
+        taxonomy = Taxonomy({"A": {"A", "B"}, "B": {"A", "B"}, "C": {"A", "B", "C"},
+                             "D": {"A", "B", "C", "D"}, "E": {"A", "B", "C", "D", "E", "F"}})
+        self.assertEqual(taxonomy.equivalents("B"), {"A", "B"})
+        self.assertEqual(taxonomy.equivalents("C"), {"C"})
+        self.assertEqual(taxonomy.direct_superclasses("D"), {"C"})
+        self.assertEqual(taxonomy.direct_superclasses("E"), {"D", "F"})
+        self.assertEqual(taxonomy.direct_subclasses("A"), {"C"})
+        self.assertEqual(taxonomy.ancestors("E"), {"A", "B", "C", "D", "F"})
+        self.assertEqual(taxonomy.descendants("C"), {"D", "E"})
+        self.assertEqual(sorted(taxonomy.roots()), [["A", "B"], ["F"]])
+        self.assertTrue(taxonomy.is_subsumed("E", "B"))
+        self.assertFalse(taxonomy.is_subsumed("F", "E"))
+
+    def test_pizza_against_the_subsumer_sets(self):
+        classification = ELReasoner3(Ontology(PIZZA, loader="python")).classify()[0]
+        taxonomy = Taxonomy(classification)
+        for class_name, subsumers in classification.items():
+            with self.subTest(class_name=class_name):
+                self.assertEqual(taxonomy.subsumers(class_name), subsumers)
+                equivalents = {other for other in subsumers if class_name in classification[other]}
+                self.assertEqual(taxonomy.equivalents(class_name), equivalents)
+                # direct parents by comparing the subsumer sets of all pairs
+                strict = subsumers - equivalents
+                parents = {parent for parent in strict
+                           if not any(parent in classification[other] - taxonomy.equivalents(other)
+                                      for other in strict)}
+                self.assertEqual(taxonomy.direct_superclasses(class_name), parents)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+from bitset import ConceptSet
+from concept_graph import NAME, TOP, BOTTOM
+
+"""
+Transitive closure of the told hierarchy, the atomic GCIs A ⊑ B between concept names (and ⊤, ⊥).
+
+The atomic GCIs form a directed graph over the names. Its strongly connected components (names that
+are told to be equivalent through a cycle) are found with Tarjan's algorithm and condensed, and the
+closure is propagated through the condensed DAG in reverse topological order, one int bitset per
+component, so a whole set of ancestors is merged with a single OR.
+
+With the closure, the ⊑-rule assigns all told ancestors of a name in one application, together with
+the rhs of the complex GCIs of all of them, instead of climbing the hierarchy one level per round.
+"""
+
+
+def atomic(graph, concept):
+    kind = graph.kinds[concept]
+    return kind == NAME or kind == TOP or kind == BOTTOM
+
+
+def strongly_connected_components(nodes, edges):
+    """
+    Tarjan's algorithm, iterative so that deep hierarchies do not hit the recursion limit.
+    :param edges: node -> list of successor nodes
+    :return: list of components (lists of nodes), every component comes after all components it reaches
+    """
+    index = {}
+    lowlink = {}
+    on_stack = set()
+    stack = []
+    components = []
+    for root in nodes:
+        if root in index:
+            continue
+        index[root] = lowlink[root] = len(index)
+        stack.append(root)
+        on_stack.add(root)
+        # (node, iterator over its successors) of the depth-first search
+        path = [(root, iter(edges.get(root, ())))]
+        while path:
+            node, successors = path[-1]
+            for successor in successors:
+                if successor not in index:
+                    index[successor] = lowlink[successor] = len(index)
+                    stack.append(successor)
+                    on_stack.add(successor)
+                    path.append((successor, iter(edges.get(successor, ()))))
+                    break
+                if successor in on_stack:
+                    lowlink[node] = min(lowlink[node], index[successor])
+            else:
+                path.pop()
+                if path:
+                    parent = path[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(component)
+    return components
+
+
+def ancestor_bits(graph):
+    """
+    :return: atomic concept -> bits of its told ancestors (itself included) and of the rhs of the
+             complex GCIs of all of them
+    """
+    edges = {}
+    complex_bits = {}
+    for lhs, rhs_concepts in graph.told_subsumers.items():
+        if not atomic(graph, lhs):
+            continue
+        for rhs in rhs_concepts:
+            if atomic(graph, rhs):
+                edges.setdefault(lhs, []).append(rhs)
+            else:
+                complex_bits[lhs] = complex_bits.get(lhs, 0) | 1 << rhs
+    nodes = set(edges)
+    nodes.update(complex_bits)
+    for successors in edges.values():
+        nodes.update(successors)
+
+    closure = {}
+    for component in strongly_connected_components(sorted(nodes), edges):
+        bits = 0
+        for node in component:
+            bits |= 1 << node | complex_bits.get(node, 0)
+            for successor in edges.get(node, ()):
+                # successors in other components are finished already, the own component adds nothing
+                bits |= closure.get(successor, 0)
+        for node in component:
+            closure[node] = bits
+    return closure
+
+
+def told_closure(graph):
+    """
+    :return: lhs -> ConceptSet of everything the ⊑-rule assigns, directly or through atomic GCIs,
+             to an element with the lhs, for every lhs of a GCI
+    """
+    closure = ancestor_bits(graph)
+    told = {}
+    for lhs, rhs_concepts in graph.told_subsumers.items():
+        bits = 0
+        for rhs in rhs_concepts:
+            bits |= closure.get(rhs, 1 << rhs)
+        told[lhs] = ConceptSet(bits=bits)
+    return told
+
+
+def told_sets(graph, closure=False):
+    """
+    The GCIs of the graph as lhs -> ConceptSet of rhs concepts for the ⊑-rule of reasoners 1 and 2,
+    cached on the graph until its TBox changes.
+    :param closure: assign the whole told closure at once instead of the direct rhs concepts only
+    """
+    told = graph.told_cache.get(closure)
+    if told is None:
+        if closure:
+            told = told_closure(graph)
+        else:
+            told = {lhs: ConceptSet(rhs_concepts) for lhs, rhs_concepts in graph.told_subsumers.items()}
+        graph.told_cache[closure] = told
+    return told